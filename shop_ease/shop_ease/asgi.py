@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shop_ease.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.WARMUP_ON_BOOT:
+    from shopping_cart.warmup import warm_up  # noqa: E402
+
+    warm_up(close_connections=settings.WARMUP_PRELOAD)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "shopping_cart.tracing.TracingMiddleware",
+    "shopping_cart.profiling.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -81,10 +84,170 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections open between requests instead of reconnecting per
+        # request.
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+# Serialized products (shopping_cart.caching), apart from the default cache so
+# large multi-gets cannot evict anything else.
+PRODUCT_CACHE_MAX_ENTRIES = 20000
+
+# Redis server holding the caches every worker must share (products, carts,
+# versions). Without one they fall back to a per-process cache, which is only
+# correct with a single worker process or sticky sessions that pin each user to
+# one worker.
+REDIS_URL = os.environ.get("REDIS_URL")
+
+
+def shared_cache(prefix, max_entries=1000000):
+    if REDIS_URL:
+        return {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": prefix,
+        }
+    return {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": f"shop_ease_{prefix}",
+        "OPTIONS": {"MAX_ENTRIES": max_entries},
+    }
+
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "shop_ease",
+    },
+    # Shared, so deleting a changed product drops it for every worker.
+    "products": shared_cache("products", PRODUCT_CACHE_MAX_ENTRIES),
+    # Carts are user state: every worker must see the same cart and no other
+    # cache traffic may evict one.
+    "carts": shared_cache("carts"),
+    # Version numbers of cached data sets (shopping_cart.caching.get_version).
+    # Shared, so a write handled by one worker retires the copies every worker
+    # holds; kept in memory, as every cache hit reads one.
+    "versions": shared_cache("versions"),
+}
+
+# Run shopping_cart.warmup.warm_up() when a wsgi/asgi worker loads the application.
+WARMUP_ON_BOOT = False
+
+# Set when the server loads the application once before forking its workers
+# (gunicorn --preload): boot warm-up then closes its database connections so the
+# workers do not share them.
+WARMUP_PRELOAD = False
+
+# Number of most recently updated products pre-loaded into the cache by warm-up
+# (at most half of PRODUCT_CACHE_MAX_ENTRIES).
+WARMUP_PRODUCT_LIMIT = 5000
+
+# Seconds a serialized product stays in the cache.
+PRODUCT_CACHE_TTL = 60 * 5
+
+# Seconds before the in-process product name index is rebuilt from the database.
+PRODUCT_INDEX_TTL = 60 * 10
+
+# Seconds a computed order price quote stays in the cache.
+PRICING_QUOTE_TTL = 60 * 5
+
+# Seconds a worker keeps its compiled pricing rules before recompiling them, for
+# rule changes that do not bump the rule version.
+PRICING_RULES_MAX_AGE = 60
+
+# Seconds computed product price facets stay in the cache.
+FACET_CACHE_TTL = 60 * 5
+
+# Number of users whose rendered order history is kept in each worker's LRU cache.
+ORDER_HISTORY_CACHE_SIZE = 10000
+
+# "Frequently bought together" index (shopping_cart.recommendations), written by
+# the refresh_recommendations command: related products kept per product.
+RECOMMENDATION_INDEX_PATH = BASE_DIR / "recommendations" / "related_products.npz"
+RECOMMENDATION_TOP_K = 20
+
+# Seconds before the previous refresh that refresh_recommendations re-scans, for
+# orders whose transaction committed after it ran.
+RECOMMENDATION_REFRESH_OVERLAP = 60
+
+# Seconds before the newest projected write that the order projection catch-up
+# (shopping_cart.projection) re-scans, for transactions that committed late.
+ORDER_PROJECTION_CATCH_UP_OVERLAP = 60
+
+# Seconds an untouched shopping cart is kept in the cache.
+CART_TTL = 60 * 60 * 24
+
+# Most units of one product and most distinct products a cart may hold.
+CART_MAX_QUANTITY = 1000
+CART_MAX_LINES = 100
+
+# Request tracing (shopping_cart.tracing). Traced requests are exported as
+# OTLP/JSON lines when head-sampled at TRACE_SAMPLE_RATE or slower than
+# TRACE_SLOW_REQUEST_MS.
+TRACING_ENABLED = False
+TRACE_SERVICE_NAME = "shop_ease"
+TRACE_SAMPLE_RATE = 0.01
+TRACE_SLOW_REQUEST_MS = 500
+TRACE_EXPORT_PATH = BASE_DIR / "traces" / "traces.otlp.jsonl"
+TRACE_EXPORT_MAX_BYTES = 10 * 1024 * 1024
+TRACE_EXPORT_BACKUP_COUNT = 5
+TRACE_EXPORT_QUEUE_SIZE = 1000
+
+# On-demand profiling (shopping_cart.profiling): staff users send "X-Profile: 1"
+# to profile a request, and PROFILE_SAMPLE_RATE profiles requests at random.
+PROFILING_ENABLED = False
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_DIR = BASE_DIR / "profiles"
+PROFILE_RETENTION_PER_VIEW = 20
+
+# Composite requests (shopping_cart.batch): most sub-requests per batch, and the
+# threads each worker uses to run a batch's GET requests concurrently.
+BATCH_REQUEST_LIMIT = 20
+BATCH_MAX_WORKERS = 4
+
+
+# Password hashing (shopping_cart.hashers). New and changed passwords are hashed
+# with PASSWORD_HASHER_PROFILE; passwords stored with another profile or older
+# parameters still work and are rehashed on the user's next login. Tune the
+# parameters with `python manage.py benchmark_logins` on the serving hardware.
+PASSWORD_HASHER_PROFILES = {
+    "argon2": {
+        "hasher": "shopping_cart.hashers.Argon2PasswordHasher",
+        "time_cost": 2,
+        "memory_cost": 19 * 1024,
+        "parallelism": 1,
+    },
+    "scrypt": {
+        "hasher": "shopping_cart.hashers.ScryptPasswordHasher",
+        "work_factor": 2**15,
+        "block_size": 8,
+        "parallelism": 3,
+        "maxmem": 64 * 1024 * 1024,
+    },
+    "pbkdf2": {
+        "hasher": "shopping_cart.hashers.PBKDF2PasswordHasher",
+        "iterations": 720000,
+    },
+}
+PASSWORD_HASHER_PROFILE = "argon2"
+PASSWORD_HASHERS = [PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]["hasher"]] + [
+    profile["hasher"]
+    for name, profile in PASSWORD_HASHER_PROFILES.items()
+    if name != PASSWORD_HASHER_PROFILE
+]
+
+# Threads per worker that compute password hashes, and the logins that may be in
+# flight before /api/token/ answers 503.
+PASSWORD_HASH_MAX_WORKERS = 2
+PASSWORD_HASH_MAX_PENDING = 32
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -128,7 +291,11 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "shopping_cart.tracing.TracedJWTAuthentication",
+    ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "shopping_cart.tracing.TracedJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ),
 }
 
@@ -138,4 +305,7 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_LIFETIME": timedelta(days=30),
     "SLIDING_TOKEN_REFRESH_LIFETIME_LATE_USER": timedelta(days=1),
     "SLIDING_TOKEN_LIFETIME_LATE_USER": timedelta(days=30),
-}
\ No newline at end of file
+}
+
+# Stock held for an unpaid order is returned to inventory after this long.
+STOCK_RESERVATION_TTL = timedelta(minutes=15)
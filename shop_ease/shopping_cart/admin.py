@@ -1,3 +1,10 @@
 from django.contrib import admin
 
-# Register your models here.
+from shopping_cart.models import PricingRule
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = ["name", "kind", "product", "category", "coupon_code", "is_active"]
+    list_filter = ["kind", "is_active"]
+    search_fields = ["name", "coupon_code", "category"]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ShoppingCartConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shopping_cart'
+
+    def ready(self):
+        from shopping_cart import signals  # noqa: F401
@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from shopping_cart.caching import invalidate_order_history
+from shopping_cart.models import ArchivedOrder, ArchivedRecord, Order, Product, User
+
+SETTLED_PAYMENT_STATUSES = ("Completed", "Failed")
+
+# Soft-deleted rows that are still referenced elsewhere are left in place,
+# since deleting them would cascade into live or archived order history.
+COMPACTION_EXCLUDES = {
+    Product: Q(orderitem__isnull=False),
+    User: Q(order__isnull=False) | Q(archivedorder__isnull=False),
+}
+
+
+def compact_soft_deleted(model, older_than_days=30, batch_size=500):
+    """
+    Move soft-deleted rows of ``model`` into the ArchivedRecord table.
+
+    Rows qualify once they have been soft-deleted for longer than
+    ``older_than_days`` (``updated_at`` is bumped by the soft delete). Each
+    batch is copied and removed in its own transaction, so the job can be
+    interrupted and re-run at any point.
+
+    Returns:
+    - int: Number of rows archived.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    label = model._meta.label
+    candidates = (
+        model.all_objects.deleted()
+        .filter(updated_at__lt=cutoff)
+        .exclude(COMPACTION_EXCLUDES.get(model, Q()))
+        .order_by("pk")
+    )
+    archived = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            rows = list(candidates.filter(pk__gt=last_pk).values()[:batch_size])
+            if not rows:
+                break
+            ArchivedRecord.objects.bulk_create(
+                [
+                    ArchivedRecord(
+                        model_label=label,
+                        object_id=row["id"],
+                        payload=row,
+                        deleted_at=row["updated_at"],
+                    )
+                    for row in rows
+                ],
+                ignore_conflicts=True,
+            )
+            model.all_objects.filter(pk__in=[row["id"] for row in rows]).delete()
+        archived += len(rows)
+        last_pk = rows[-1]["id"]
+    return archived
+
+
+def archive_settled_orders(older_than_days=365, batch_size=500):
+    """
+    Move settled orders older than ``older_than_days`` into ArchivedOrder.
+
+    An order is settled once its payment is Completed or Failed. Each batch
+    writes the archive rows and deletes the originals (cascading to the
+    items and payment) in one transaction; archive rows are keyed on the
+    original order id, so an interrupted run is simply resumed by running
+    it again.
+
+    Returns:
+    - int: Number of orders archived.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    candidates = (
+        Order.objects.filter(
+            payment__payment_status__in=SETTLED_PAYMENT_STATUSES,
+            created_at__lt=cutoff,
+        )
+        .select_related("payment")
+        .prefetch_related("orderitem_set")
+        .order_by("pk")
+    )
+    archived = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            orders = list(candidates.filter(pk__gt=last_pk)[:batch_size])
+            if not orders:
+                break
+            ArchivedOrder.objects.bulk_create(
+                [_to_archived_order(order) for order in orders],
+                ignore_conflicts=True,
+            )
+            Order.objects.filter(pk__in=[order.pk for order in orders]).delete()
+            invalidate_order_history(order.user_id for order in orders)
+        archived += len(orders)
+        last_pk = orders[-1].pk
+    return archived
+
+
+def _to_archived_order(order):
+    payment = order.payment
+    return ArchivedOrder(
+        order_id=order.pk,
+        user_id=order.user_id,
+        total_price=order.total_price,
+        items=[
+            {
+                "product_id": item.product_id,
+                "product_name": item.product_name,
+                "product_description": item.product_description,
+                "price": item.unit_price,
+                "quantity": item.quantity,
+            }
+            for item in order.orderitem_set.all()
+        ],
+        payment_method=payment.payment_method,
+        transaction_id=payment.transaction_id,
+        amount_paid=payment.amount_paid,
+        payment_status=payment.payment_status,
+        created_at=order.created_at,
+    )
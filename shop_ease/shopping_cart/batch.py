@@ -0,0 +1,191 @@
+import io
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+BATCH_PATH = "/api/batch/"
+# Sub-requests may not log in or nest batches.
+EXCLUDED_PATHS = {BATCH_PATH, "/api/token/", "/api/token/refresh/"}
+ALLOWED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class InvalidSubRequest(Exception):
+    """
+    Raised when a batch entry is not a well-formed sub-request.
+    """
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.BATCH_MAX_WORKERS,
+                    thread_name_prefix="batch-request",
+                )
+    return _executor
+
+
+def parse_sub_request(entry):
+    """
+    Validate one batch entry.
+
+    Returns:
+    - dict: The entry's ``id``, ``method``, ``path``, ``query`` string,
+      ``body`` and ``headers``.
+
+    Raises:
+    - InvalidSubRequest: If the entry is malformed.
+    """
+    if not isinstance(entry, dict):
+        raise InvalidSubRequest("Each request must be an object")
+    method = str(entry.get("method", "GET")).upper()
+    if method not in ALLOWED_METHODS:
+        raise InvalidSubRequest(f"Unsupported method {method}")
+    url = urlsplit(str(entry.get("path", "")))
+    if not url.path.startswith("/api/") or url.scheme or url.netloc:
+        raise InvalidSubRequest("path must be an /api/ route of this service")
+    params = entry.get("params") or {}
+    headers = entry.get("headers") or {}
+    if not isinstance(params, dict) or not isinstance(headers, dict):
+        raise InvalidSubRequest("params and headers must be objects")
+    query = "&".join(filter(None, [url.query, urlencode(params, doseq=True)]))
+    return {
+        "id": entry.get("id"),
+        "method": method,
+        "path": url.path,
+        "query": query,
+        "body": entry.get("body"),
+        "headers": headers,
+    }
+
+
+def run_batch(request, sub_requests):
+    """
+    Dispatch parsed sub-requests to their views as the batch's user.
+
+    The user authenticated for the batch is handed to every sub-request, so
+    tokens are checked once. Runs of consecutive GET requests are served
+    concurrently from a thread pool; any other method runs on its own, in
+    order, so reads listed after a write see its result. Inside an open
+    transaction everything runs sequentially, since other threads' connections
+    could not see its uncommitted rows.
+
+    Returns:
+    - list: One ``{"id", "status", "headers", "body"}`` dict per sub-request.
+    """
+    concurrent = not connection.in_atomic_block
+    results = []
+    pending_reads = []
+    for sub_request in sub_requests:
+        if sub_request["method"] == "GET" and concurrent:
+            pending_reads.append(sub_request)
+            continue
+        results.extend(_run_reads(request, pending_reads))
+        pending_reads = []
+        results.append(dispatch(request, sub_request))
+    results.extend(_run_reads(request, pending_reads))
+    return results
+
+
+def _run_reads(request, sub_requests):
+    if len(sub_requests) < 2:
+        return [dispatch(request, sub_request) for sub_request in sub_requests]
+    futures = [
+        _get_executor().submit(_dispatch_in_worker, request, sub_request)
+        for sub_request in sub_requests
+    ]
+    return [future.result() for future in futures]
+
+
+def _dispatch_in_worker(request, sub_request):
+    # Pool threads keep their own connections; recycle them like a request
+    # thread would.
+    close_old_connections()
+    try:
+        return dispatch(request, sub_request)
+    finally:
+        close_old_connections()
+
+
+def dispatch(request, sub_request):
+    """
+    Run one sub-request through its view and capture the response.
+    """
+    result = {"id": sub_request["id"]}
+    if sub_request["path"] in EXCLUDED_PATHS:
+        result.update(status=400, headers={}, body={"error": "Path not allowed"})
+        return result
+    try:
+        match = resolve(sub_request["path"])
+    except Resolver404:
+        result.update(status=404, headers={}, body={"error": "Not found"})
+        return result
+    http_request = _build_request(request, sub_request)
+    http_request.resolver_match = match
+    http_request._force_auth_user = request.user
+    http_request._force_auth_token = request.auth
+    try:
+        response = match.func(http_request, *match.args, **match.kwargs)
+    except Exception:
+        logger.exception(
+            "Batched request %s %s failed", http_request.method, http_request.path
+        )
+        result.update(status=500, headers={}, body={"error": "Internal server error"})
+        return result
+    body = getattr(response, "data", None)
+    if body is None and not response.streaming and response.content:
+        body = response.content.decode(response.charset, errors="replace")
+    result.update(
+        status=response.status_code,
+        headers={
+            name: value
+            for name, value in response.items()
+            if name not in ("Content-Type", "Vary", "Allow", "Content-Length")
+        },
+        body=body,
+    )
+    return result
+
+
+def _build_request(request, sub_request):
+    body = b""
+    if sub_request["body"] is not None:
+        body = json.dumps(sub_request["body"]).encode()
+    environ = {
+        key: value
+        for key, value in request._request.META.items()
+        if not key.startswith("HTTP_") and not key.startswith("CONTENT_")
+    }
+    for name in ("HTTP_HOST", "HTTP_USER_AGENT", "HTTP_ACCEPT_LANGUAGE"):
+        if name in request._request.META:
+            environ[name] = request._request.META[name]
+    for name, value in sub_request["headers"].items():
+        environ["HTTP_" + name.upper().replace("-", "_")] = str(value)
+    environ.update(
+        {
+            "REQUEST_METHOD": sub_request["method"],
+            "PATH_INFO": sub_request["path"],
+            "SCRIPT_NAME": "",
+            "QUERY_STRING": sub_request["query"],
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "HTTP_ACCEPT": "application/json",
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    environ.setdefault("wsgi.url_scheme", request.scheme)
+    return WSGIRequest(environ)
@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def product_cache_key(product_id):
+    return f"product:{product_id}"
+
+
+def get_cached_products(product_ids):
+    """
+    Look up serialized products in the "products" cache.
+
+    Returns:
+    - dict: ``{product_id: product_data}`` for the ids found in the cache.
+    """
+    cached = caches["products"].get_many([product_cache_key(pk) for pk in product_ids])
+    return {
+        pk: cached[product_cache_key(pk)]
+        for pk in product_ids
+        if product_cache_key(pk) in cached
+    }
+
+
+def cache_products(products_by_id):
+    caches["products"].set_many(
+        {product_cache_key(pk): data for pk, data in products_by_id.items()},
+        timeout=settings.PRODUCT_CACHE_TTL,
+    )
+
+
+def invalidate_products(product_ids):
+    """
+    Drop cached product entries now and again once the transaction commits.
+
+    The second pass catches readers that re-cached the old row between the
+    write and the commit.
+    """
+    products = caches["products"]
+    keys = [product_cache_key(pk) for pk in product_ids]
+    products.delete_many(keys)
+    transaction.on_commit(lambda: products.delete_many(keys))
+
+
+CATALOG_VERSION = "catalog"
+PRICING_RULES_VERSION = "pricing_rules"
+
+
+def get_version(name):
+    """
+    Return the current version number of a cached data set.
+
+    Derived cache entries embed this number in their keys, so bumping it
+    invalidates all of them at once. Versions live in the "versions" cache,
+    which every worker shares, and are taken from the current time rather
+    than counted up, so they do not repeat after that cache is flushed
+    while in-process copies tagged with an old version are still around.
+    """
+    versions = caches["versions"]
+    key = f"version:{name}"
+    version = versions.get(key)
+    if version is None:
+        version = time.time_ns()
+        if not versions.add(key, version, timeout=None):
+            version = versions.get(key, version)
+    return version
+
+
+def bump_version(name):
+    # A fresh timestamp instead of incr(), so a version never repeats one
+    # handed out before the cache was flushed.
+    caches["versions"].set(f"version:{name}", time.time_ns(), timeout=None)
+
+
+class LRUCache:
+    """
+    Bounded in-process cache evicting the least recently used entry.
+
+    Every entry is stored with a version; looking it up with another version
+    counts as a miss and drops it. Hit, miss and eviction counters are kept
+    for monitoring.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else None,
+            }
+
+
+order_history_cache = LRUCache(settings.ORDER_HISTORY_CACHE_SIZE)
+
+
+def order_history_version(user_id):
+    """
+    Return the version a user's cached order history must carry.
+
+    It lives in the shared "versions" cache, so a write handled by any
+    worker retires the history in every worker. Read it before querying the
+    database for a fresh history.
+    """
+    return get_version(f"order_history:{user_id}")
+
+
+def invalidate_order_history(user_ids):
+    """
+    Retire cached order histories once the current transaction commits.
+    """
+    user_ids = set(user_ids)
+
+    def bump():
+        for user_id in user_ids:
+            bump_version(f"order_history:{user_id}")
+            order_history_cache.delete(user_id)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.cache import caches
+
+
+class CartFull(Exception):
+    """
+    Raised when a line would exceed ``CART_MAX_QUANTITY`` or the cart would
+    hold more than ``CART_MAX_LINES`` products.
+    """
+
+
+class Cart:
+    """
+    Shopping cart of a user, kept in the "carts" cache until checkout.
+
+    Every line is a cache key of its own holding the quantity, so adding to
+    a line is one atomic ``incr`` and concurrent changes never overwrite
+    each other. The products of the cart are listed in numbered slot keys,
+    handed out with ``incr`` the first time a product is added; a removed
+    line stays at quantity 0 and keeps its slot. All keys of a cart expire
+    ``CART_TTL`` seconds after its last change.
+    """
+
+    def __init__(self, user):
+        self.cache = caches["carts"]
+        self.prefix = f"cart:{user.pk}"
+        self.slots_key = f"{self.prefix}:slots"
+        self._items = None
+
+    def _line_key(self, product_id):
+        return f"{self.prefix}:line:{product_id}"
+
+    def _slot_key(self, slot):
+        return f"{self.prefix}:slot:{slot}"
+
+    @property
+    def items(self):
+        """
+        The ``{product_id: quantity}`` lines of the cart.
+        """
+        if self._items is None:
+            self._items = self._load()[1]
+        return self._items
+
+    def _load(self):
+        slots = self.cache.get(self.slots_key, 0)
+        slot_keys = [self._slot_key(slot) for slot in range(1, slots + 1)]
+        product_ids = list(dict.fromkeys(self.cache.get_many(slot_keys).values()))
+        line_keys = {
+            self._line_key(product_id): product_id for product_id in product_ids
+        }
+        quantities = self.cache.get_many(list(line_keys))
+        items = {
+            line_keys[key]: quantity
+            for key, quantity in quantities.items()
+            if quantity > 0
+        }
+        return [self.slots_key, *slot_keys, *line_keys], items
+
+    def _changed(self):
+        keys, self._items = self._load()
+        for key in keys:
+            self.cache.touch(key, settings.CART_TTL)
+
+    def _allot_slot(self, product_id, line_key):
+        self.cache.add(self.slots_key, 0, timeout=settings.CART_TTL)
+        slot = self.cache.incr(self.slots_key)
+        if slot > settings.CART_MAX_LINES:
+            self.cache.delete(line_key)
+            raise CartFull(
+                f"A cart can hold at most {settings.CART_MAX_LINES} products"
+            )
+        self.cache.set(self._slot_key(slot), product_id, timeout=settings.CART_TTL)
+
+    def _check_quantity(self, quantity):
+        if quantity > settings.CART_MAX_QUANTITY:
+            raise CartFull(
+                f"A cart line can hold at most {settings.CART_MAX_QUANTITY} units"
+            )
+
+    def add(self, product_id, quantity):
+        """
+        Raises:
+        - CartFull: If the line or the cart would grow past its limit.
+        """
+        self._check_quantity(quantity)
+        line_key = self._line_key(product_id)
+        while not self.cache.add(line_key, quantity, timeout=settings.CART_TTL):
+            try:
+                total = self.cache.incr(line_key, quantity)
+            except ValueError:
+                # The line expired since add() found it; start it again.
+                continue
+            if total > settings.CART_MAX_QUANTITY:
+                self.cache.decr(line_key, quantity)
+                self._check_quantity(total)
+            break
+        else:
+            self._allot_slot(product_id, line_key)
+        self._changed()
+
+    def set(self, product_id, quantity):
+        """
+        Raises:
+        - CartFull: If the line or the cart would grow past its limit.
+        """
+        self._check_quantity(quantity)
+        line_key = self._line_key(product_id)
+        if quantity and self.cache.add(line_key, quantity, timeout=settings.CART_TTL):
+            self._allot_slot(product_id, line_key)
+        elif quantity or self.cache.get(line_key):
+            self.cache.set(line_key, quantity, timeout=settings.CART_TTL)
+        self._changed()
+
+    def remove(self, product_id):
+        self.set(product_id, 0)
+
+    def clear(self):
+        keys, _ = self._load()
+        self.cache.delete_many(keys)
+        self._items = {}
+
+    def as_order_lines(self):
+        return [
+            {"product_id": product_id, "quantity": quantity}
+            for product_id, quantity in self.items.items()
+        ]
@@ -0,0 +1,85 @@
+from django.db import models
+
+
+class VersionConflict(Exception):
+    """
+    Raised when a row changed since it was read and the write was refused.
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+        super().__init__(
+            f"{instance._meta.object_name} {instance.pk} was modified by another "
+            "request. Fetch it again and retry."
+        )
+
+
+def make_etag(version):
+    return f'"{version}"'
+
+
+class VersionedModel(models.Model):
+    """
+    Abstract model with optimistic concurrency control.
+
+    Every update of an existing row is a compare-and-swap on ``version``:
+    the UPDATE only matches the row if it still carries the version this
+    instance was read with, and bumps it by one. A lost race raises
+    VersionConflict instead of overwriting the other writer, and no row
+    lock is held beyond the UPDATE itself. Bulk ``update()`` calls that
+    change a versioned row must bump the version themselves.
+
+    Attributes:
+    - version: Number of the current revision of the row.
+    """
+
+    version = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def etag(self):
+        return make_etag(self.version)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        if self._state.adding:
+            # Saving a new instance with a preset pk tries an UPDATE first.
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update
+            )
+        version_field = self._meta.get_field("version")
+        expected = self.version
+        values = [
+            (field, model, value)
+            for field, model, value in values
+            if field is not version_field
+        ]
+        values.append((version_field, None, expected + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=expected),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        )
+        if not updated:
+            raise VersionConflict(self)
+        self.version = expected + 1
+        return True
+
+
+def if_match_failed(request, instance):
+    """
+    Check the ``If-Match`` request header against the current ``instance``.
+
+    Returns:
+    - bool: True if the header is present and names none of the instance's
+      current ETag or ``*``; the request should then fail with 412.
+    """
+    header = request.headers.get("If-Match")
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" not in tags and instance.etag not in tags
@@ -0,0 +1,117 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingPoolBusy(Exception):
+    """
+    Raised when too many logins are already waiting for the hashing pool.
+    """
+
+
+class HashingPool:
+    """
+    Bounded pool of threads that password hashes are computed on.
+
+    The hash functions release the GIL, so without a bound every request
+    thread checking a password would keep a CPU busy at once. Hashing on
+    ``PASSWORD_HASH_MAX_WORKERS`` threads per process leaves the remaining
+    CPUs to other requests during a login storm, and ``admit()`` turns
+    logins away once ``PASSWORD_HASH_MAX_PENDING`` of them are in flight.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._local = threading.local()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # A forked child inherits the executor but not its threads.
+        self._lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=settings.PASSWORD_HASH_MAX_WORKERS,
+                        thread_name_prefix="password-hash",
+                        initializer=self._mark_worker,
+                    )
+        return self._executor
+
+    def _mark_worker(self):
+        self._local.in_pool = True
+
+    def run(self, function, *args, **kwargs):
+        """
+        Call ``function`` on a pool thread and return its result.
+        """
+        if getattr(self._local, "in_pool", False):
+            return function(*args, **kwargs)
+        return self._get_executor().submit(function, *args, **kwargs).result()
+
+    @contextmanager
+    def admit(self):
+        """
+        Hold one of the ``PASSWORD_HASH_MAX_PENDING`` login slots.
+
+        Raises:
+        - HashingPoolBusy: If every slot is taken.
+        """
+        with self._lock:
+            if self._in_flight >= settings.PASSWORD_HASH_MAX_PENDING:
+                raise HashingPoolBusy
+            self._in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+hashing_pool = HashingPool()
+
+
+class ProfiledHasherMixin:
+    """
+    Take the cost parameters of a hasher from its entry in
+    ``PASSWORD_HASHER_PROFILES`` and compute hashes on the hashing pool.
+
+    Django rehashes a password on login when its stored parameters differ
+    from these (``must_update``), so retuning a profile or switching
+    ``PASSWORD_HASHER_PROFILE`` migrates users as they log in.
+    """
+
+    profile = None
+
+    def __init__(self):
+        for name, value in settings.PASSWORD_HASHER_PROFILES[self.profile].items():
+            if name != "hasher":
+                setattr(self, name, value)
+
+    def encode(self, *args, **kwargs):
+        return hashing_pool.run(super().encode, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        return hashing_pool.run(super().verify, password, encoded)
+
+
+class Argon2PasswordHasher(ProfiledHasherMixin, hashers.Argon2PasswordHasher):
+    profile = "argon2"
+
+
+class ScryptPasswordHasher(ProfiledHasherMixin, hashers.ScryptPasswordHasher):
+    profile = "scrypt"
+
+
+class PBKDF2PasswordHasher(ProfiledHasherMixin, hashers.PBKDF2PasswordHasher):
+    profile = "pbkdf2"
@@ -0,0 +1,166 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from shopping_cart.caching import invalidate_products
+from shopping_cart.models import Product, StockReservation
+
+
+class OutOfStock(Exception):
+    """
+    Raised when a product cannot cover the requested quantity.
+    """
+
+    def __init__(self, product_id):
+        self.product_id = product_id
+        super().__init__(f"Insufficient stock for product {product_id}")
+
+
+def _take(product_id, quantity):
+    # A single conditional UPDATE: the stock check and the decrement happen
+    # atomically in the database, so no read-check-write race and the row
+    # lock is only held for the statement (and the rest of the transaction).
+    updated = Product.all_objects.filter(pk=product_id, stock__gte=quantity).update(
+        stock=F("stock") - quantity, version=F("version") + 1
+    )
+    if not updated:
+        raise OutOfStock(product_id)
+    invalidate_products([product_id])
+
+
+def _give_back(product_id, quantity):
+    Product.all_objects.filter(pk=product_id, stock__isnull=False).update(
+        stock=F("stock") + quantity, version=F("version") + 1
+    )
+    invalidate_products([product_id])
+
+
+def reserve_stock(order, order_lines, status=StockReservation.HELD):
+    """
+    Decrement stock for ``order_lines`` and record held reservations.
+
+    ``order_lines`` is an iterable of ``(product, quantity)`` pairs; products
+    without tracked stock are skipped. Products are decremented in id order
+    so concurrent checkouts never wait on each other in a cycle. Must run
+    inside the transaction that creates or updates the order, ideally as
+    its last step. Pass ``status=StockReservation.COMMITTED`` when the order
+    is paid in the same transaction.
+
+    Raises:
+    - OutOfStock: If any tracked product cannot cover its quantity.
+    """
+    quantities = defaultdict(int)
+    for product, quantity in order_lines:
+        if product.stock is not None:
+            quantities[product.pk] += int(quantity)
+    expires_at = timezone.now() + settings.STOCK_RESERVATION_TTL
+    reservations = []
+    for product_id in sorted(quantities):
+        _take(product_id, quantities[product_id])
+        reservations.append(
+            StockReservation(
+                order=order,
+                product_id=product_id,
+                quantity=quantities[product_id],
+                expires_at=expires_at,
+                status=status,
+            )
+        )
+    StockReservation.objects.bulk_create(reservations)
+
+
+def _release(reservations):
+    released = 0
+    for reservation in reservations:
+        # Flip the status first; only the caller that wins the flip puts the
+        # units back, so concurrent releases cannot double-count.
+        flipped = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.HELD
+        ).update(status=StockReservation.RELEASED, updated_at=timezone.now())
+        if flipped:
+            _give_back(reservation.product_id, reservation.quantity)
+            released += 1
+    return released
+
+
+def release_reservations(order):
+    """
+    Return the stock held for ``order`` to inventory.
+
+    Returns:
+    - int: Number of reservations released.
+    """
+    held = StockReservation.objects.filter(
+        order=order, status=StockReservation.HELD
+    ).order_by("product_id")
+    return _release(held)
+
+
+def replace_reservations(order, order_lines):
+    """
+    Swap the open reservations of ``order`` for ones matching ``order_lines``.
+
+    Used when an unpaid order's lines are rewritten: held stock is given
+    back and the new quantities are reserved afresh.
+
+    Raises:
+    - OutOfStock: If any tracked product cannot cover its new quantity.
+    """
+    release_reservations(order)
+    StockReservation.objects.filter(
+        order=order, status=StockReservation.RELEASED
+    ).delete()
+    reserve_stock(order, order_lines)
+
+
+def commit_reservations(order):
+    """
+    Turn the stock held for ``order`` into a permanent sale.
+
+    Reservations that already expired are re-acquired, since their units
+    went back on sale in the meantime.
+
+    Raises:
+    - OutOfStock: If expired stock can no longer be re-acquired.
+    """
+    now = timezone.now()
+    # Held rows are committed with one conditional flip, so a row the expiry
+    # job releases concurrently is either committed here with its stock still
+    # taken, or left RELEASED for the loop below.
+    StockReservation.objects.filter(order=order, status=StockReservation.HELD).update(
+        status=StockReservation.COMMITTED, updated_at=now
+    )
+    expired = StockReservation.objects.filter(
+        order=order, status=StockReservation.RELEASED
+    ).order_by("product_id")
+    for reservation in expired:
+        # Only the caller that wins the flip re-takes the units.
+        flipped = StockReservation.objects.filter(
+            pk=reservation.pk, status=StockReservation.RELEASED
+        ).update(status=StockReservation.COMMITTED, updated_at=now)
+        if flipped:
+            _take(reservation.product_id, reservation.quantity)
+
+
+def release_expired_reservations(batch_size=500):
+    """
+    Release held reservations whose hold time has run out.
+
+    Returns:
+    - int: Number of reservations released.
+    """
+    released = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                StockReservation.objects.filter(
+                    status=StockReservation.HELD, expires_at__lte=timezone.now()
+                ).order_by("product_id")[:batch_size]
+            )
+            if not expired:
+                break
+            released += _release(expired)
+    return released
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.archive import archive_settled_orders
+
+
+class Command(BaseCommand):
+    help = "Move settled orders older than the cutoff into the order archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="Only archive orders created more than this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        archived = archive_settled_orders(
+            older_than_days=options["days"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Archived {archived} order(s)")
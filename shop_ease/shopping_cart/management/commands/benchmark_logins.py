@@ -0,0 +1,64 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password checks per second for each password hasher profile, "
+        "run through the hashing pool the way concurrent logins are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profiles",
+            nargs="+",
+            default=list(settings.PASSWORD_HASHER_PROFILES),
+            help="Profiles of PASSWORD_HASHER_PROFILES to measure.",
+        )
+        parser.add_argument("--logins", type=int, default=100)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=16,
+            help="Logins submitted at the same time.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{settings.PASSWORD_HASH_MAX_WORKERS} hashing thread(s), "
+            f"{options['concurrency']} concurrent logins"
+        )
+        for name in options["profiles"]:
+            if name not in settings.PASSWORD_HASHER_PROFILES:
+                raise CommandError(f"Unknown password hasher profile {name}")
+            hasher = import_string(settings.PASSWORD_HASHER_PROFILES[name]["hasher"])()
+            try:
+                encoded = hasher.encode("correct horse battery", hasher.salt())
+            except ValueError as err:
+                # The hasher's library is not installed.
+                self.stdout.write(f"{name:>8}: skipped, {err}")
+                continue
+
+            started = time.perf_counter()
+            hasher.verify("correct horse battery", encoded)
+            single_ms = (time.perf_counter() - started) * 1000
+
+            with ThreadPoolExecutor(max_workers=options["concurrency"]) as logins:
+                started = time.perf_counter()
+                results = list(
+                    logins.map(
+                        lambda _: hasher.verify("correct horse battery", encoded),
+                        range(options["logins"]),
+                    )
+                )
+                elapsed = time.perf_counter() - started
+            if not all(results):
+                raise CommandError(f"Profile {name} failed to verify its own hash")
+            self.stdout.write(
+                f"{name:>8}: {single_ms:8.1f} ms/login, "
+                f"{options['logins'] / elapsed:8.1f} logins/s"
+            )
@@ -0,0 +1,89 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from shopping_cart.models import PricingRule, Product
+from shopping_cart.pricing import CompiledRules, price_order
+
+
+class Command(BaseCommand):
+    help = "Benchmark order pricing against a synthetic catalog and rule set."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10000)
+        parser.add_argument("--categories", type=int, default=50)
+        parser.add_argument("--rules", type=int, default=5000)
+        parser.add_argument(
+            "--lines",
+            type=int,
+            nargs="+",
+            default=[10, 100, 500],
+            help="Cart sizes (number of order lines) to price.",
+        )
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        categories = [f"category-{n}" for n in range(options["categories"])]
+        products = [
+            Product(
+                pk=pk,
+                product_name=f"product-{pk}",
+                price=Decimal(rng.randint(100, 100000)) / 100,
+                category=rng.choice(categories),
+            )
+            for pk in range(1, options["products"] + 1)
+        ]
+        rules = []
+        for n in range(options["rules"]):
+            kind = rng.choice([PricingRule.VOLUME, PricingRule.CATEGORY])
+            rules.append(
+                PricingRule(
+                    name=f"rule-{n}",
+                    kind=kind,
+                    product_id=(
+                        rng.choice(products).pk if kind == PricingRule.VOLUME else None
+                    ),
+                    category=(
+                        rng.choice(categories) if kind == PricingRule.CATEGORY else None
+                    ),
+                    min_quantity=rng.randint(1, 50),
+                    percent_off=Decimal(rng.randint(1, 30)),
+                )
+            )
+        rules.append(
+            PricingRule(
+                name="coupon",
+                kind=PricingRule.COUPON,
+                coupon_code="BENCH",
+                percent_off=Decimal(5),
+            )
+        )
+
+        started = time.perf_counter()
+        compiled = CompiledRules(rules)
+        compile_ms = (time.perf_counter() - started) * 1000
+        self.stdout.write(
+            f"Compiled {len(rules)} rules for {len(products)} products "
+            f"in {compile_ms:.1f} ms"
+        )
+
+        for line_count in options["lines"]:
+            carts = [
+                [
+                    (product, rng.randint(1, 60))
+                    for product in rng.sample(products, line_count)
+                ]
+                for _ in range(options["iterations"])
+            ]
+            started = time.perf_counter()
+            for cart in carts:
+                price_order(cart, "BENCH", compiled)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{line_count:>5} lines: {elapsed / len(carts) * 1000:8.3f} ms/cart, "
+                f"{len(carts) * line_count / elapsed:12.0f} lines/s"
+            )
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.archive import compact_soft_deleted
+from shopping_cart.models import Product, User
+
+MODELS = {"product": Product, "user": User}
+
+
+class Command(BaseCommand):
+    help = "Move long soft-deleted users and products into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Only archive rows soft-deleted more than this many days ago.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--model",
+            choices=sorted(MODELS),
+            action="append",
+            help="Restrict compaction to the given model (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        for name in options["model"] or sorted(MODELS):
+            archived = compact_soft_deleted(
+                MODELS[name],
+                older_than_days=options["days"],
+                batch_size=options["batch_size"],
+            )
+            self.stdout.write(f"{name}: archived {archived} row(s)")
@@ -0,0 +1,127 @@
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: times the import of the entrypoint module
+# (which sets up Django and loads the application) and, optionally, warm-up.
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import importlib
+importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+warmup_ms = None
+if sys.argv[2] == "1":
+    from shopping_cart import warmup
+    if warmup.last_timings is None:
+        warmup.warm_up()
+        warmup_ms = (time.perf_counter() - imported) * 1000
+    else:
+        # WARMUP_ON_BOOT already warmed up while the entrypoint was imported.
+        warmup_ms = sum(ms for ms in warmup.last_timings.values() if ms)
+        imported -= warmup_ms / 1000
+print(json.dumps({"import_ms": (imported - started) * 1000, "warmup_ms": warmup_ms}))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start time of the wsgi/asgi entrypoints in fresh "
+        "interpreters, optionally appending the results to a history file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--module",
+            action="append",
+            help="Entrypoint module to measure (default: shop_ease.wsgi and shop_ease.asgi).",
+        )
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument(
+            "--warmup", action="store_true", help="Also time shopping_cart warm-up."
+        )
+        parser.add_argument(
+            "--label", default="", help="Release label stored with the results."
+        )
+        parser.add_argument(
+            "--record",
+            help="Append a JSON line with the results to this file to track releases.",
+        )
+        parser.add_argument(
+            "--importtime",
+            action="store_true",
+            help="Show the slowest imports of one extra run (python -X importtime).",
+        )
+
+    def handle(self, *args, **options):
+        modules = options["module"] or ["shop_ease.wsgi", "shop_ease.asgi"]
+        results = {}
+        for module in modules:
+            samples = [
+                self._probe(module, options["warmup"]) for _ in range(options["runs"])
+            ]
+            summary = {
+                key: round(statistics.median(s[key] for s in samples), 1)
+                for key in ("process_ms", "import_ms")
+            }
+            if options["warmup"]:
+                summary["warmup_ms"] = round(
+                    statistics.median(s["warmup_ms"] for s in samples), 1
+                )
+            results[module] = summary
+            self.stdout.write(
+                f"{module}: "
+                + ", ".join(f"{key}={value}" for key, value in summary.items())
+                + f" (median of {options['runs']})"
+            )
+            if options["importtime"]:
+                self._show_importtime(module)
+
+        if options["record"]:
+            record = {
+                "label": options["label"],
+                "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "results": results,
+            }
+            with open(options["record"], "a") as history:
+                history.write(json.dumps(record) + "\n")
+            self.stdout.write(f"Recorded results in {options['record']}")
+
+    def _probe(self, module, warmup):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE, module, "1" if warmup else "0"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        sample["process_ms"] = (time.perf_counter() - started) * 1000
+        return sample
+
+    def _show_importtime(self, module, top=15):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        rows = []
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            rows.append((int(cumulative), name.strip()))
+        for cumulative, name in sorted(rows, reverse=True)[:top]:
+            self.stdout.write(f"  {cumulative / 1000:8.1f} ms  {name}")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.projection import catch_up_projections, rebuild_projections
+
+
+class Command(BaseCommand):
+    help = (
+        "Bring the order projection up to date with orders and payments written "
+        "since the last projected write, or rebuild it from scratch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Render every order again instead of catching up.",
+        )
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            projected = rebuild_projections(batch_size=options["batch_size"])
+        else:
+            projected = catch_up_projections(batch_size=options["batch_size"])
+        self.stdout.write(f"Projected {projected} order(s)")
@@ -0,0 +1,45 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand
+
+from shopping_cart.provisioning import PROVISIONING_BATCH_SIZE, provision_users
+
+FIELDS = ["username", "email", "password", "first_name", "last_name", "phone_number"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Register the users listed in a CSV file with the columns "
+        + ", ".join(FIELDS)
+        + ", hashing their passwords in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row.")
+        parser.add_argument("--batch-size", type=int, default=PROVISIONING_BATCH_SIZE)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Processes hashing passwords; all CPUs by default.",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as csv_file:
+            rows = (
+                {field: row.get(field) or "" for field in FIELDS}
+                for row in csv.DictReader(csv_file)
+            )
+            results = provision_users(
+                rows, batch_size=options["batch_size"], workers=options["workers"]
+            )
+        provisioned = 0
+        for line, result in enumerate(results, start=2):
+            if result["status"] == 201:
+                provisioned += 1
+                continue
+            self.stderr.write(f"Line {line}: {json.dumps(result['errors'])}")
+        self.stdout.write(
+            f"Provisioned {provisioned} user(s), {len(results) - provisioned} failed"
+        )
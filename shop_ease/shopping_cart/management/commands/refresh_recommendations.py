@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.recommendations import SCAN_CHUNK_SIZE, refresh_recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Count orders placed since the last refresh into the frequently bought "
+        "together index, or rebuild it from every order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Count every order again instead of only the new ones.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=SCAN_CHUNK_SIZE,
+            help="Order items read per query.",
+        )
+
+    def handle(self, *args, **options):
+        counted = refresh_recommendations(
+            rebuild=options["rebuild"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(f"Counted {counted} order(s)")
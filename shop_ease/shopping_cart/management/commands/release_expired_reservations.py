@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.inventory import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Return stock held by unpaid orders whose reservation has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options["batch_size"])
+        self.stdout.write(f"Released {released} reservation(s)")
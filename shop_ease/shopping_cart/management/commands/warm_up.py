@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from shopping_cart.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the worker warm-up steps and report their timings. Shared state "
+        "(the product cache on a shared cache backend, the database) stays warm "
+        "for the workers; per-process state only warms this process."
+    )
+
+    def handle(self, *args, **options):
+        for step, elapsed in warm_up().items():
+            outcome = "failed" if elapsed is None else f"{elapsed:.1f} ms"
+            self.stdout.write(f"{step:>15}: {outcome}")
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:11
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping_cart', '0008_soft_delete_managers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.BigIntegerField(unique=True)),
+                ('total_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('items', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('payment_method', models.CharField(max_length=20)),
+                ('transaction_id', models.UUIDField()),
+                ('amount_paid', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('payment_status', models.CharField(max_length=20)),
+                ('created_at', models.DateTimeField(null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='archivedorder_user_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopping_cart", "0010_stock_reservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="coupon_code",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="discount_total",
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="category",
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.CreateModel(
+            name="PricingRule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("Volume", "Volume"),
+                            ("Category", "Category"),
+                            ("Coupon", "Coupon"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("category", models.CharField(blank=True, max_length=50, null=True)),
+                ("coupon_code", models.CharField(blank=True, max_length=50, null=True)),
+                ("min_quantity", models.PositiveIntegerField(default=1)),
+                (
+                    "percent_off",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=5),
+                ),
+                (
+                    "amount_off",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=10),
+                ),
+                ("is_active", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="shopping_cart.product",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:29
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def backfill_snapshots(apps, schema_editor):
+    """
+    Copy the current product name, description and price onto existing
+    order items, one committed batch at a time.
+    """
+    OrderItem = apps.get_model("shopping_cart", "OrderItem")
+    pending = (
+        OrderItem._base_manager.filter(unit_price__isnull=True)
+        .select_related("product")
+        .order_by("pk")
+    )
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            items = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not items:
+                break
+            for item in items:
+                item.product_name = item.product.product_name
+                item.product_description = item.product.description
+                item.unit_price = item.product.price
+            OrderItem._base_manager.bulk_update(
+                items, ["product_name", "product_description", "unit_price"]
+            )
+        last_pk = items[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("shopping_cart", "0012_optimistic_versions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_description",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="product_name",
+            field=models.CharField(max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="orderitem",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,152 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:45
+
+import django.db.models.deletion
+import rest_framework.utils.encoders
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def backfill_projections(apps, schema_editor):
+    """
+    Render a projection row for every existing order, one committed batch at
+    a time, in the shapes the order and payment APIs return.
+    """
+    Order = apps.get_model("shopping_cart", "Order")
+    OrderItem = apps.get_model("shopping_cart", "OrderItem")
+    OrderProjection = apps.get_model("shopping_cart", "OrderProjection")
+    Payment = apps.get_model("shopping_cart", "Payment")
+    pending = Order._base_manager.order_by("pk")
+    last_pk = 0
+    while True:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            orders = list(pending.filter(pk__gt=last_pk)[:BATCH_SIZE])
+            if not orders:
+                break
+            product_details = {order.pk: [] for order in orders}
+            for item in OrderItem._base_manager.filter(order__in=orders).order_by("pk"):
+                product_details[item.order_id].append(
+                    {
+                        "product_id": item.product_id,
+                        "product_name": item.product_name,
+                        "product_description": item.product_description,
+                        "price": item.unit_price,
+                        "quantity": item.quantity,
+                    }
+                )
+            payments = {
+                payment.order_id: payment
+                for payment in Payment._base_manager.filter(order__in=orders)
+            }
+            projections = []
+            for order in orders:
+                payment = payments.get(order.pk)
+                projections.append(
+                    OrderProjection(
+                        order_id=order.pk,
+                        user_id=order.user_id,
+                        document={
+                            "order_id": order.pk,
+                            "user_id": order.user_id,
+                            "product_details": product_details[order.pk],
+                            "total_price": order.total_price,
+                        },
+                        payment=payment
+                        and {
+                            "id": payment.pk,
+                            "order": order.pk,
+                            "payment_method": payment.payment_method,
+                            "transaction_id": str(payment.transaction_id),
+                            "amount_paid": str(payment.amount_paid),
+                            "payment_status": payment.payment_status,
+                            "version": payment.version,
+                        },
+                        payment_status=payment and payment.payment_status,
+                        order_version=order.version,
+                        created_at=order.created_at,
+                        source_updated_at=(
+                            max(order.updated_at, payment.updated_at)
+                            if payment
+                            else order.updated_at
+                        ),
+                    )
+                )
+            OrderProjection._base_manager.bulk_create(
+                projections, ignore_conflicts=True
+            )
+        last_pk = orders[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ("shopping_cart", "0013_order_item_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderProjection",
+            fields=[
+                (
+                    "order",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="projection",
+                        serialize=False,
+                        to="shopping_cart.order",
+                    ),
+                ),
+                (
+                    "document",
+                    models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder),
+                ),
+                (
+                    "payment",
+                    models.JSONField(
+                        encoder=rest_framework.utils.encoders.JSONEncoder, null=True
+                    ),
+                ),
+                ("payment_status", models.CharField(max_length=20, null=True)),
+                ("order_version", models.PositiveIntegerField()),
+                ("created_at", models.DateTimeField(null=True)),
+                ("source_updated_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["updated_at"], name="order_updated_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["created_at"], name="order_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["updated_at"], name="payment_updated_idx"),
+        ),
+        migrations.AddField(
+            model_name="orderprojection",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderprojection",
+            index=models.Index(
+                fields=["user", "order"], name="projection_user_order_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderprojection",
+            index=models.Index(
+                fields=["source_updated_at"], name="projection_source_upd_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_projections, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-19 02:52
+
+from django.db import migrations, models
+
+
+def backfill_total_price(apps, schema_editor):
+    """
+    Copy the order total onto existing projection rows.
+    """
+    Order = apps.get_model("shopping_cart", "Order")
+    OrderProjection = apps.get_model("shopping_cart", "OrderProjection")
+    OrderProjection._base_manager.update(
+        total_price=models.Subquery(
+            Order._base_manager.filter(pk=models.OuterRef("order")).values(
+                "total_price"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopping_cart", "0014_order_projection"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="orderprojection",
+            name="total_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_total_price, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="orderprojection",
+            index=models.Index(
+                fields=["user", "created_at"], name="projection_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderprojection",
+            index=models.Index(
+                fields=["user", "payment_status", "created_at"],
+                name="projection_user_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="orderprojection",
+            index=models.Index(
+                fields=["user", "total_price"], name="projection_user_price_idx"
+            ),
+        ),
+    ]
@@ -1,6 +1,54 @@
 import uuid
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from rest_framework.utils.encoders import JSONEncoder
+
+from shopping_cart.concurrency import VersionedModel
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """
+    QuerySet helpers for models carrying an ``is_delete`` flag.
+    """
+
+    def live(self):
+        return self.filter(is_delete=False)
+
+    def deleted(self):
+        return self.filter(is_delete=True)
+
+
+class AllObjectsManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Manager exposing every row, soft-deleted or not.
+    """
+
+
+class SoftDeleteManager(AllObjectsManager):
+    """
+    Default manager that hides soft-deleted rows.
+
+    Use the model's ``all_objects`` manager when deleted rows are needed.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().live()
+
+
+class AllUsersManager(UserManager.from_queryset(SoftDeleteQuerySet)):
+    """
+    UserManager exposing every user, soft-deleted or not.
+    """
+
+
+class SoftDeleteUserManager(AllUsersManager):
+    """
+    UserManager variant that hides soft-deleted users.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().live()
 
 
 class User(AbstractUser):
@@ -39,11 +87,23 @@ class User(AbstractUser):
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteUserManager()
+    all_objects = AllUsersManager()
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(is_delete=True),
+                name="user_deleted_updated_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"User -> {self.email}"
 
 
-class Product(models.Model):
+class Product(VersionedModel):
     """
     Model representing a product.
 
@@ -51,32 +111,62 @@ class Product(models.Model):
     - product_name: Name of the product.
     - description: Description of the product (optional).
     - price: Price of the product.
+    - category: Category used by promotions (optional).
+    - stock: Units available for sale (null when stock is not tracked).
     - is_delete: Boolean indicating if the product is deleted.
     - created_at: Date and time when the product was created.
     - updated_at: Date and time when the product was last updated.
+    - version: Revision of the product, checked on every update.
     """
 
     product_name = models.CharField(max_length=100)
     description = models.CharField(max_length=100, null=True, blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.CharField(max_length=50, null=True, blank=True)
+    stock = models.PositiveIntegerField(null=True, blank=True)
     is_delete = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SoftDeleteManager()
+    all_objects = AllObjectsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["product_name"],
+                condition=models.Q(is_delete=False),
+                name="product_live_name_idx",
+            ),
+            models.Index(
+                fields=["price"],
+                condition=models.Q(is_delete=False),
+                name="product_live_price_idx",
+            ),
+            models.Index(
+                fields=["updated_at"],
+                condition=models.Q(is_delete=True),
+                name="product_deleted_updated_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"Product -> {self.product_name}"
 
 
-class Order(models.Model):
+class Order(VersionedModel):
     """
     Model representing an order.
 
     Attributes:
     - user: User who placed the order.
     - products: Many-to-many relationship with products through OrderItem.
-    - total_price: Total price of the order.
+    - total_price: Total price of the order, after discounts.
+    - discount_total: Amount taken off the order by promotions.
+    - coupon_code: Coupon applied to the order (optional).
     - created_at: Date and time when the order was created.
     - updated_at: Date and time when the order was last updated.
+    - version: Revision of the order, checked on every update.
     """
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -84,9 +174,18 @@ class Order(models.Model):
     total_price = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
     )
+    discount_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    coupon_code = models.CharField(max_length=50, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="order_updated_idx"),
+            # Orders scanned by each recommendation refresh.
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
+
     def __str__(self):
         return f"Order -> {self.user.email}"
 
@@ -99,6 +198,9 @@ class OrderItem(models.Model):
     - order: Order to which the item belongs.
     - product: Product in the order.
     - quantity: Quantity of the product in the order.
+    - product_name: Name of the product when it was ordered.
+    - product_description: Description of the product when it was ordered.
+    - unit_price: Price of the product when it was ordered.
     - created_at: Date and time when the order item was created.
     - updated_at: Date and time when the order item was last updated.
     """
@@ -106,14 +208,110 @@ class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
+    product_name = models.CharField(max_length=100, null=True)
+    product_description = models.CharField(max_length=100, null=True, blank=True)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"OrderItem -> {self.product_name}"
+
+
+class PricingRule(models.Model):
+    """
+    Model representing a promotion applied when pricing orders.
+
+    Kinds:
+    - Volume: percent off a product's lines once the line quantity reaches min_quantity.
+    - Category: percent off lines of products in a category once the line quantity
+      reaches min_quantity.
+    - Coupon: percent and/or fixed amount off the order when coupon_code is given.
+
+    Attributes:
+    - name: Name of the promotion.
+    - kind: Kind of the promotion (Volume/Category/Coupon).
+    - product: Product targeted by a volume rule.
+    - category: Category targeted by a category rule.
+    - coupon_code: Code redeeming a coupon rule.
+    - min_quantity: Line quantity from which a volume or category rule applies.
+    - percent_off: Percentage discount.
+    - amount_off: Fixed discount (coupons only).
+    - is_active: Boolean indicating if the rule is applied.
+    - created_at: Date and time when the rule was created.
+    - updated_at: Date and time when the rule was last updated.
+    """
+
+    VOLUME = "Volume"
+    CATEGORY = "Category"
+    COUPON = "Coupon"
+    KIND_CHOICES = (
+        (VOLUME, "Volume"),
+        (CATEGORY, "Category"),
+        (COUPON, "Coupon"),
+    )
+
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, null=True, blank=True
+    )
+    category = models.CharField(max_length=50, null=True, blank=True)
+    coupon_code = models.CharField(max_length=50, null=True, blank=True)
+    min_quantity = models.PositiveIntegerField(default=1)
+    percent_off = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    amount_off = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"OrderItem -> {self.product.product_name}"
+        return f"PricingRule -> {self.name}"
+
 
+class StockReservation(models.Model):
+    """
+    Model representing stock held for an order until it is paid.
 
-class Payment(models.Model):
+    Attributes:
+    - order: Order holding the stock.
+    - product: Product whose stock is held.
+    - quantity: Number of units held.
+    - status: Status of the reservation (Held/Committed/Released).
+    - expires_at: Date and time after which a held reservation is released.
+    - created_at: Date and time when the reservation was created.
+    - updated_at: Date and time when the reservation was last updated.
+    """
+
+    HELD = "Held"
+    COMMITTED = "Committed"
+    RELEASED = "Released"
+    STATUS_CHOICES = (
+        (HELD, "Held"),
+        (COMMITTED, "Committed"),
+        (RELEASED, "Released"),
+    )
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=HELD)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "expires_at"], name="reservation_status_exp_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"StockReservation -> {self.order_id}:{self.product_id}"
+
+
+class Payment(VersionedModel):
     """
     Model representing a payment for an order.
 
@@ -125,6 +323,7 @@ class Payment(models.Model):
     - payment_status: Status of the payment (Pending/Completed/Failed).
     - created_at: Date and time when the payment was created.
     - updated_at: Date and time when the payment was last updated.
+    - version: Revision of the payment, checked on every update.
     """
 
     PAYMENT_STATUS_CHOICES = (
@@ -149,5 +348,141 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at"], name="payment_updated_idx"),
+        ]
+
     def __str__(self):
         return f"Payment for Order {self.order.id}"
+
+
+class ArchivedRecord(models.Model):
+    """
+    Model holding soft-deleted rows moved out of their hot table.
+
+    Attributes:
+    - model_label: Label of the model the row came from (e.g. shopping_cart.Product).
+    - object_id: Primary key of the row in its original table.
+    - payload: Serialized column values of the row.
+    - deleted_at: Date and time the row was last updated while soft-deleted.
+    - archived_at: Date and time when the row was archived.
+    """
+
+    model_label = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    deleted_at = models.DateTimeField(null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["model_label", "object_id"],
+                name="archivedrecord_unique_object",
+            ),
+        ]
+
+    def __str__(self):
+        return f"ArchivedRecord -> {self.model_label}:{self.object_id}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Model representing a settled order moved into cold storage.
+
+    The order, its items and its payment are flattened into one compact row
+    so archived history can be served without touching the hot tables.
+
+    Attributes:
+    - order_id: Primary key the order had in the Order table.
+    - user: User who placed the order.
+    - total_price: Total price of the order.
+    - items: Snapshot of the order lines (product details and quantity).
+    - payment_method: Method used for payment.
+    - transaction_id: Unique identifier for the payment transaction.
+    - amount_paid: Amount paid for the order.
+    - payment_status: Final status of the payment (Completed/Failed).
+    - created_at: Date and time when the order was created.
+    - archived_at: Date and time when the order was archived.
+    """
+
+    order_id = models.BigIntegerField(unique=True)
+    # Cold storage must outlive compaction of the user row.
+    user = models.ForeignKey(User, on_delete=models.PROTECT)
+    total_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    items = models.JSONField(encoder=DjangoJSONEncoder)
+    payment_method = models.CharField(max_length=20)
+    transaction_id = models.UUIDField()
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
+    payment_status = models.CharField(max_length=20)
+    created_at = models.DateTimeField(null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "created_at"], name="archivedorder_user_created_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"ArchivedOrder -> {self.order_id}"
+
+
+class OrderProjection(models.Model):
+    """
+    Model holding the read-side copy of an order, rendered for the API.
+
+    One row per order stores the order and its payment exactly as the order
+    and payment endpoints return them, so reads are a single indexed row
+    lookup instead of joining orders, items and payments. Rows are written
+    by shopping_cart.projection whenever an order or payment is.
+
+    Attributes:
+    - order: Order the row was rendered from (also the primary key).
+    - user: User who placed the order.
+    - document: The order as returned by the order API.
+    - payment: The payment as returned by the payment API (null until paid).
+    - payment_status: Status of the payment (null until a payment exists).
+    - total_price: Total price of the order.
+    - order_version: Revision of the order the row was rendered from.
+    - created_at: Date and time when the order was created.
+    - source_updated_at: Latest update time of the order and its payment.
+    """
+
+    order = models.OneToOneField(
+        Order, on_delete=models.CASCADE, primary_key=True, related_name="projection"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    document = models.JSONField(encoder=JSONEncoder)
+    payment = models.JSONField(encoder=JSONEncoder, null=True)
+    payment_status = models.CharField(max_length=20, null=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)
+    order_version = models.PositiveIntegerField()
+    created_at = models.DateTimeField(null=True)
+    source_updated_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "order"], name="projection_user_order_idx"),
+            # Order search filters (see ManageOrderAPIView.get).
+            models.Index(
+                fields=["user", "created_at"], name="projection_user_created_idx"
+            ),
+            models.Index(
+                fields=["user", "payment_status", "created_at"],
+                name="projection_user_status_idx",
+            ),
+            models.Index(
+                fields=["user", "total_price"], name="projection_user_price_idx"
+            ),
+            models.Index(
+                fields=["source_updated_at"], name="projection_source_upd_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"OrderProjection -> {self.order_id}"
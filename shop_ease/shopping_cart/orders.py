@@ -0,0 +1,342 @@
+from django.db import transaction
+from django.utils import timezone
+
+from shopping_cart.caching import invalidate_order_history
+from shopping_cart.inventory import OutOfStock, reserve_stock
+from shopping_cart.models import (
+    Order,
+    OrderItem,
+    Payment,
+    Product,
+    StockReservation,
+    User,
+)
+from shopping_cart.pricing import (
+    InvalidCoupon,
+    get_compiled_rules,
+    price_order,
+    quote_order,
+)
+from shopping_cart.projection import project_orders
+
+BATCH_ORDER_LIMIT = 1000
+BATCH_CHUNK_SIZE = 200
+
+
+def parse_order_lines(products):
+    """
+    Normalize request order lines into ``(product_id, quantity)`` pairs.
+
+    Raises:
+    - Product.DoesNotExist: If a line has no usable product id.
+    - ValueError: If ``products`` is not a list of objects, or a quantity is
+      not a whole number of at least 1.
+    """
+    if not isinstance(products, list) or not all(
+        isinstance(product_data, dict) for product_data in products
+    ):
+        raise ValueError("Products must be a list of objects")
+    order_lines = []
+    for product_data in products:
+        try:
+            product_id = int(product_data.get("product_id"))
+        except (TypeError, ValueError):
+            raise Product.DoesNotExist("One or more products do not exist")
+        quantity = int(product_data.get("quantity"))
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1")
+        order_lines.append((product_id, quantity))
+    return order_lines
+
+
+class AmountMismatch(Exception):
+    """
+    Raised when a checkout pays a different amount than the order total.
+    """
+
+    def __init__(self, total_price):
+        self.total_price = total_price
+        super().__init__(
+            f"Amount paid does not match total amount {total_price}. Payment failed."
+        )
+
+
+def create_order(user, products, coupon_code=None):
+    """
+    Create an order with its items for ``user``.
+
+    ``products`` is a list of ``{"product_id": ..., "quantity": ...}`` dicts,
+    as accepted by the order API. All products are resolved with one query
+    and the items are written with one bulk insert. Must be called inside a
+    transaction.
+
+    Returns:
+    - Order: The created order with ``total_price`` set.
+
+    Raises:
+    - Product.DoesNotExist: If any product does not exist.
+    - InvalidCoupon: If ``coupon_code`` does not match an active coupon.
+    - OutOfStock: If any tracked product cannot cover its quantity.
+    """
+    order_lines, quote = quote_request(products, coupon_code)
+    order_obj = insert_order(user, order_lines, quote)
+    project_orders([order_obj.pk])
+    return order_obj
+
+
+def checkout_order(user, products, payment_method, amount_paid, coupon_code=None):
+    """
+    Create, price and pay an order for ``user`` in one go.
+
+    The amount is checked against the quote before anything is written, and
+    stock is committed directly instead of being held, so checkout costs one
+    product query, the order, item, reservation and payment inserts, one
+    update per tracked product and the projection of the order. Must be
+    called inside a transaction.
+
+    Returns:
+    - tuple: The created ``(order, payment)``.
+
+    Raises:
+    - Product.DoesNotExist: If any product does not exist.
+    - InvalidCoupon: If ``coupon_code`` does not match an active coupon.
+    - AmountMismatch: If ``amount_paid`` differs from the order total.
+    - OutOfStock: If any tracked product cannot cover its quantity.
+    """
+    order_lines, quote = quote_request(products, coupon_code)
+    if amount_paid != quote["total_price"]:
+        raise AmountMismatch(quote["total_price"])
+    order_obj = insert_order(
+        user, order_lines, quote, reservation_status=StockReservation.COMMITTED
+    )
+    payment = Payment.objects.create(
+        order=order_obj,
+        payment_method=payment_method,
+        amount_paid=amount_paid,
+        payment_status="Completed",
+    )
+    project_orders([order_obj.pk])
+    return order_obj, payment
+
+
+def quote_request(products, coupon_code=None):
+    """
+    Resolve and price the order lines of an order request.
+
+    Returns:
+    - tuple: ``(order_lines, quote)`` with ``(product, quantity)`` lines.
+    """
+    requested = parse_order_lines(products)
+    product_map = Product.objects.in_bulk({product_id for product_id, _ in requested})
+    order_lines = resolve_order_lines(requested, product_map)
+    return order_lines, quote_order(order_lines, coupon_code)
+
+
+def insert_order(user, order_lines, quote, reservation_status=StockReservation.HELD):
+    order_obj = Order.objects.create(
+        user=user,
+        total_price=quote["total_price"],
+        discount_total=quote["discount_total"],
+        coupon_code=quote["coupon_code"],
+    )
+    OrderItem.objects.bulk_create(build_order_items(order_obj, order_lines))
+    reserve_stock(order_obj, order_lines, reservation_status)
+    invalidate_order_history([user.pk])
+    return order_obj
+
+
+def create_orders_in_bulk(order_requests, requested_by):
+    """
+    Create many orders at once, reporting the outcome of each one.
+
+    ``order_requests`` is a list of ``{"products": [...], "user_id": ...,
+    "coupon_code": ..., "reference": ...}`` dicts; ``user_id`` defaults to ``requested_by`` and
+    ``reference`` is echoed back to help the caller match results. Products
+    and users for the whole batch are resolved with one query each, and
+    orders and items are bulk-inserted per chunk. An order that fails (for
+    example on stock) is dropped on its own without affecting the others.
+    Must be called inside a transaction.
+
+    Returns:
+    - list: One result dict per request, in request order.
+    """
+    results = [{"reference": data.get("reference")} for data in order_requests]
+    parsed = {}
+    for index, data in enumerate(order_requests):
+        try:
+            user_id = data.get("user_id")
+            parsed[index] = (
+                None if user_id is None else int(user_id),
+                parse_order_lines(data.get("products", [])),
+            )
+        except (Product.DoesNotExist, ValueError, TypeError, AttributeError):
+            results[index].update(status=400, error="Invalid order data")
+
+    product_map = Product.objects.in_bulk(
+        {product_id for _, lines in parsed.values() for product_id, _ in lines}
+    )
+    user_map = User.objects.in_bulk(
+        {user_id for user_id, _ in parsed.values() if user_id is not None}
+    )
+
+    rules = get_compiled_rules()
+    pending = []
+    for index, (user_id, requested) in parsed.items():
+        user = requested_by if user_id is None else user_map.get(user_id)
+        if user is None:
+            results[index].update(status=404, error="User not found")
+            continue
+        if user != requested_by and not requested_by.is_staff:
+            results[index].update(
+                status=403, error="Not allowed to order for another user"
+            )
+            continue
+        try:
+            order_lines = resolve_order_lines(requested, product_map)
+            quote = price_order(
+                order_lines, order_requests[index].get("coupon_code"), rules
+            )
+        except Product.DoesNotExist:
+            results[index].update(status=404, error="One or more products do not exist")
+            continue
+        except InvalidCoupon as e:
+            results[index].update(status=400, error=str(e))
+            continue
+        pending.append((index, user, order_lines, quote))
+
+    for start in range(0, len(pending), BATCH_CHUNK_SIZE):
+        _create_chunk(pending[start : start + BATCH_CHUNK_SIZE], results)
+    return results
+
+
+def _create_chunk(chunk, results):
+    orders = Order.objects.bulk_create(
+        [
+            Order(
+                user=user,
+                total_price=quote["total_price"],
+                discount_total=quote["discount_total"],
+                coupon_code=quote["coupon_code"],
+            )
+            for _, user, _, quote in chunk
+        ]
+    )
+    created_items = []
+    failed_ids = []
+    for (index, _, order_lines, _), order_obj in zip(chunk, orders):
+        try:
+            # A savepoint per order with tracked stock, so a stock failure
+            # only undoes that order.
+            if any(product.stock is not None for product, _ in order_lines):
+                with transaction.atomic():
+                    reserve_stock(order_obj, order_lines)
+        except OutOfStock as e:
+            failed_ids.append(order_obj.pk)
+            results[index].update(status=409, error=str(e))
+            continue
+        created_items.extend(build_order_items(order_obj, order_lines))
+        results[index].update(
+            status=201, order_id=order_obj.pk, total_price=order_obj.total_price
+        )
+    if failed_ids:
+        Order.objects.filter(pk__in=failed_ids).delete()
+    OrderItem.objects.bulk_create(created_items, batch_size=BATCH_CHUNK_SIZE)
+    project_orders(order_obj.pk for order_obj in orders)
+    invalidate_order_history(order_obj.user_id for order_obj in orders)
+
+
+def resolve_order_lines(requested, product_map):
+    """
+    Pair requested ``(product_id, quantity)`` lines with fetched products.
+
+    Raises:
+    - Product.DoesNotExist: If a product is missing from ``product_map``.
+    """
+    order_lines = []
+    for product_id, quantity in requested:
+        if product_id not in product_map:
+            raise Product.DoesNotExist("One or more products do not exist")
+        order_lines.append((product_map[product_id], quantity))
+    return order_lines
+
+
+class OrderSettled(Exception):
+    """
+    Raised when the lines of an order are changed after it has been paid.
+    """
+
+
+def check_order_editable(order_obj):
+    """
+    Refuse changes to an order whose payment completed.
+
+    Its stock is committed, not held, so rewriting its reservations would
+    sell the same units twice.
+
+    Raises:
+    - OrderSettled: If the order has a completed payment or committed stock.
+    """
+    if (
+        Payment.objects.filter(order=order_obj, payment_status="Completed").exists()
+        or StockReservation.objects.filter(
+            order=order_obj, status=StockReservation.COMMITTED
+        ).exists()
+    ):
+        raise OrderSettled("Paid orders cannot be changed")
+
+
+def replace_order_items(order_obj, order_lines):
+    """
+    Rewrite the items of ``order_obj`` to match ``order_lines``.
+
+    Items of products still ordered are updated in place (with a fresh
+    product snapshot), new products get new items and the rest are deleted,
+    with one query per kind of change however many lines there are.
+    """
+    existing_items = {item.product_id: item for item in order_obj.orderitem_set.all()}
+    updated_items = []
+    new_items = []
+    now = timezone.now()
+    for product, quantity in order_lines:
+        order_item = existing_items.pop(product.pk, None)
+        if order_item is None:
+            new_items.extend(build_order_items(order_obj, [(product, quantity)]))
+            continue
+        order_item.quantity = quantity
+        order_item.updated_at = now
+        updated_items.append(snapshot_product(order_item, product))
+    if existing_items:
+        OrderItem.objects.filter(
+            pk__in=[item.pk for item in existing_items.values()]
+        ).delete()
+    OrderItem.objects.bulk_update(
+        updated_items,
+        [
+            "quantity",
+            "product_name",
+            "product_description",
+            "unit_price",
+            "updated_at",
+        ],
+    )
+    OrderItem.objects.bulk_create(new_items)
+
+
+def build_order_items(order_obj, order_lines):
+    return [
+        snapshot_product(
+            OrderItem(order=order_obj, product=product, quantity=quantity), product
+        )
+        for product, quantity in order_lines
+    ]
+
+
+def snapshot_product(order_item, product):
+    """
+    Record the product details the order item was priced with, so order
+    reads never go back to the (possibly changed) catalog.
+    """
+    order_item.product_name = product.product_name
+    order_item.product_description = product.description
+    order_item.unit_price = product.price
+    return order_item
@@ -0,0 +1,204 @@
+import hashlib
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+from shopping_cart.caching import PRICING_RULES_VERSION, get_version
+from shopping_cart.models import PricingRule
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+ZERO = Decimal(0)
+
+
+class InvalidCoupon(Exception):
+    """
+    Raised when an order is priced with an unknown or inactive coupon code.
+    """
+
+    def __init__(self, coupon_code):
+        self.coupon_code = coupon_code
+        super().__init__(f"Invalid coupon code {coupon_code}")
+
+
+class TierTable:
+    """
+    Quantity tiers of one product or category.
+
+    Thresholds are kept sorted together with the best percentage reachable
+    at each threshold, so the discount for a quantity is one binary search
+    no matter how many rules target the product or category.
+    """
+
+    __slots__ = ("thresholds", "best_percent")
+
+    def __init__(self, tiers):
+        self.thresholds = []
+        self.best_percent = []
+        best = ZERO
+        for min_quantity, percent_off in sorted(tiers):
+            best = max(best, percent_off)
+            if self.thresholds and self.thresholds[-1] == min_quantity:
+                self.best_percent[-1] = best
+            else:
+                self.thresholds.append(min_quantity)
+                self.best_percent.append(best)
+
+    def percent_for(self, quantity):
+        index = bisect_right(self.thresholds, quantity)
+        return self.best_percent[index - 1] if index else ZERO
+
+
+class CompiledRules:
+    """
+    Active pricing rules indexed for lookup by product, category and coupon.
+    """
+
+    def __init__(self, rules):
+        product_tiers = defaultdict(list)
+        category_tiers = defaultdict(list)
+        self.coupons = {}
+        for rule in rules:
+            if rule.kind == PricingRule.VOLUME and rule.product_id is not None:
+                product_tiers[rule.product_id].append(
+                    (rule.min_quantity, rule.percent_off)
+                )
+            elif rule.kind == PricingRule.CATEGORY and rule.category:
+                category_tiers[rule.category].append(
+                    (rule.min_quantity, rule.percent_off)
+                )
+            elif rule.kind == PricingRule.COUPON and rule.coupon_code:
+                self.coupons[rule.coupon_code.upper()] = (
+                    rule.percent_off,
+                    rule.amount_off,
+                )
+        self.by_product = {pk: TierTable(t) for pk, t in product_tiers.items()}
+        self.by_category = {name: TierTable(t) for name, t in category_tiers.items()}
+
+    def line_percent(self, product, quantity):
+        """
+        Best percentage off for a line; product and category rules do not stack.
+        """
+        percent = ZERO
+        table = self.by_product.get(product.pk)
+        if table is not None:
+            percent = table.percent_for(quantity)
+        table = self.by_category.get(product.category)
+        if table is not None:
+            percent = max(percent, table.percent_for(quantity))
+        return percent
+
+
+_compiled_rules = {}
+
+
+def get_compiled_rules():
+    """
+    Return the active rules compiled for the current rule version.
+
+    The compiled rules are kept in process memory and rebuilt whenever a
+    PricingRule change bumps the shared version, and at the latest every
+    ``PRICING_RULES_MAX_AGE`` seconds for changes that bypass the signals
+    (such as ``queryset.update()``).
+    """
+    version = get_version(PRICING_RULES_VERSION)
+    entry = _compiled_rules.get(version)
+    if entry is None or time.monotonic() - entry[0] > settings.PRICING_RULES_MAX_AGE:
+        entry = (
+            time.monotonic(),
+            CompiledRules(PricingRule.objects.filter(is_active=True)),
+        )
+        _compiled_rules.clear()
+        _compiled_rules[version] = entry
+    return entry[1]
+
+
+def price_order(order_lines, coupon_code=None, rules=None):
+    """
+    Price ``(product, quantity)`` order lines with the active promotions.
+
+    Each line gets the best matching volume or category discount, then the
+    coupon (if any) is taken off the discounted subtotal. Runs in time
+    linear in the number of lines.
+
+    Returns:
+    - dict: Subtotal, discount total, total price and per-line breakdown.
+
+    Raises:
+    - InvalidCoupon: If ``coupon_code`` does not match an active coupon.
+    """
+    if rules is None:
+        rules = get_compiled_rules()
+    coupon = None
+    if coupon_code:
+        coupon = rules.coupons.get(coupon_code.upper())
+        if coupon is None:
+            raise InvalidCoupon(coupon_code)
+    subtotal = ZERO
+    line_discounts = ZERO
+    lines = []
+    for product, quantity in order_lines:
+        line_total = product.price * quantity
+        discount = (
+            line_total * rules.line_percent(product, quantity) / HUNDRED
+        ).quantize(CENT, ROUND_HALF_UP)
+        subtotal += line_total
+        line_discounts += discount
+        lines.append(
+            {
+                "product_id": product.pk,
+                "quantity": quantity,
+                "unit_price": product.price,
+                "discount": discount,
+            }
+        )
+    discounted = subtotal - line_discounts
+    coupon_discount = ZERO
+    if coupon is not None:
+        percent_off, amount_off = coupon
+        coupon_discount = (discounted * percent_off / HUNDRED).quantize(
+            CENT, ROUND_HALF_UP
+        ) + amount_off
+        coupon_discount = min(coupon_discount, discounted)
+    discount_total = line_discounts + coupon_discount
+    return {
+        "subtotal": subtotal,
+        "discount_total": discount_total,
+        "total_price": subtotal - discount_total,
+        "coupon_code": coupon_code.upper() if coupon else None,
+        "lines": lines,
+    }
+
+
+def quote_order(order_lines, coupon_code=None):
+    """
+    Cached variant of ``price_order``.
+
+    Quotes are keyed on the lines with the price and category of each
+    product as loaded, the coupon and the current rule version. A quote
+    therefore always matches the products it is given, even when a product
+    changes while it is being computed.
+    """
+    order_lines = list(order_lines)
+    signature = repr(
+        (
+            [
+                (product.pk, str(product.price), product.category, quantity)
+                for product, quantity in order_lines
+            ],
+            coupon_code,
+        )
+    )
+    key = "pricing:quote:{}:{}".format(
+        get_version(PRICING_RULES_VERSION),
+        hashlib.sha1(signature.encode()).hexdigest(),
+    )
+    quote = cache.get(key)
+    if quote is None:
+        quote = price_order(order_lines, coupon_code)
+        cache.set(key, quote, timeout=settings.PRICING_QUOTE_TTL)
+    return quote
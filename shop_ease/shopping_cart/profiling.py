@@ -0,0 +1,145 @@
+import cProfile
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_NAME_RE = re.compile(
+    r"^(?P<started>\d{8}T\d{6}\d{6})-(?P<duration>\d+)ms\.pstats$"
+)
+
+# cProfile can only run one profiler per thread; this also keeps concurrent
+# profiled requests from measuring each other.
+_profiler_lock = threading.Lock()
+
+
+def view_name(request):
+    """
+    Name profiles are filed under, such as ``ManageOrderAPIView.put``.
+    """
+    match = request.resolver_match
+    if match is None:
+        return "unresolved"
+    view_class = getattr(match.func, "view_class", None)
+    if view_class is not None:
+        return f"{view_class.__name__}.{request.method.lower()}"
+    return match.func.__name__
+
+
+def list_profiles():
+    """
+    Return the stored profiles, newest first.
+
+    Returns:
+    - list: One dict per profile with its id, view, start time, request
+      duration and file size.
+    """
+    profiles = []
+    if not settings.PROFILE_DIR.is_dir():
+        return profiles
+    for view_dir in settings.PROFILE_DIR.iterdir():
+        if not view_dir.is_dir():
+            continue
+        for path in view_dir.iterdir():
+            match = PROFILE_NAME_RE.match(path.name)
+            if match is None:
+                continue
+            profiles.append(
+                {
+                    "id": f"{view_dir.name}/{path.name}",
+                    "view": view_dir.name,
+                    "started_at": datetime.strptime(
+                        match["started"], "%Y%m%dT%H%M%S%f"
+                    ).replace(tzinfo=timezone.utc),
+                    "duration_ms": int(match["duration"]),
+                    "size": path.stat().st_size,
+                }
+            )
+    profiles.sort(key=lambda profile: profile["started_at"], reverse=True)
+    return profiles
+
+
+def profile_path(profile_id):
+    """
+    Resolve a profile id from ``list_profiles`` to its file.
+
+    Returns:
+    - Path: The profile file, or None if there is no such profile.
+    """
+    view, _, name = (profile_id or "").partition("/")
+    if not PROFILE_NAME_RE.match(name) or not re.fullmatch(r"[\w.]+", view):
+        return None
+    path = settings.PROFILE_DIR / view / name
+    return path if path.is_file() else None
+
+
+def _store(profiler, view, started, duration_ms):
+    view_dir = settings.PROFILE_DIR / view
+    view_dir.mkdir(parents=True, exist_ok=True)
+    name = f"{started.strftime('%Y%m%dT%H%M%S%f')}-{duration_ms}ms.pstats"
+    profiler.dump_stats(view_dir / name)
+    # Keep only the newest profiles of each view.
+    stored = sorted(view_dir.glob("*.pstats"), reverse=True)
+    for old in stored[settings.PROFILE_RETENTION_PER_VIEW :]:
+        old.unlink(missing_ok=True)
+    return f"{view}/{name}"
+
+
+class ProfilingMiddleware:
+    """
+    Profile individual live requests with cProfile.
+
+    A request is profiled when a staff user sends the ``X-Profile: 1``
+    header, or at random for a ``PROFILE_SAMPLE_RATE`` share of requests.
+    The pstats output is stored under ``PROFILE_DIR`` by view name, keeping
+    the newest ``PROFILE_RETENTION_PER_VIEW`` per view, and its id is
+    returned in the ``X-Profile-Id`` response header. Removed from the stack
+    unless ``PROFILING_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self._wants_profile(request) or not _profiler_lock.acquire(
+            blocking=False
+        ):
+            return self.get_response(request)
+        try:
+            started = datetime.now(timezone.utc)
+            clock = time.perf_counter()
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+            duration_ms = round((time.perf_counter() - clock) * 1000)
+            response[f"{PROFILE_HEADER}-Id"] = _store(
+                profiler, view_name(request), started, duration_ms
+            )
+            return response
+        finally:
+            _profiler_lock.release()
+
+    def _wants_profile(self, request):
+        if request.headers.get(PROFILE_HEADER) == "1":
+            return self._is_staff(request)
+        return random.random() < settings.PROFILE_SAMPLE_RATE
+
+    @staticmethod
+    def _is_staff(request):
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return authenticated is not None and authenticated[0].is_staff
@@ -0,0 +1,219 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.fields.json import KeyTransform, compile_json_path
+
+from shopping_cart.caching import invalidate_order_history
+from shopping_cart.models import Order, OrderItem, OrderProjection, Payment
+from shopping_cart.serializer import PaymentSerializer
+
+PROJECTED_FIELDS = [
+    "user",
+    "document",
+    "payment",
+    "payment_status",
+    "total_price",
+    "order_version",
+    "created_at",
+    "source_updated_at",
+]
+
+
+def render_orders(orders):
+    """
+    Render orders as returned by the order API, with their lines read from
+    the order item snapshots in one query.
+    """
+    orders = list(orders)
+    product_details = defaultdict(list)
+    if orders:
+        order_items = (
+            OrderItem.objects.filter(order__in=orders)
+            .order_by("pk")
+            .values(
+                "order_id",
+                "product_id",
+                "product_name",
+                "product_description",
+                "unit_price",
+                "quantity",
+            )
+        )
+        for item in order_items:
+            product_details[item["order_id"]].append(
+                {
+                    "product_id": item["product_id"],
+                    "product_name": item["product_name"],
+                    "product_description": item["product_description"],
+                    "price": item["unit_price"],
+                    "quantity": item["quantity"],
+                }
+            )
+    return [
+        {
+            "order_id": order.id,
+            "user_id": order.user_id,
+            "product_details": product_details[order.id],
+            "total_price": order.total_price,
+        }
+        for order in orders
+    ]
+
+
+class JSONKey(KeyTransform):
+    """
+    A key of a JSON column read as JSON, so string values that look like
+    numbers (such as amounts) stay strings on SQLite (3.38 or newer).
+    """
+
+    def as_sqlite(self, compiler, connection):
+        lhs, params, key_transforms = self.preprocess_lhs(compiler, connection)
+        return f"({lhs} -> %s)", (*params, compile_json_path(key_transforms))
+
+
+def read_documents(queryset, column, fields=None, *columns):
+    """
+    Read the rendered JSON ``column`` of the projection rows in ``queryset``.
+
+    With ``fields`` only those keys are extracted, by the database, so large
+    parts such as the order lines are not sent when they were not asked for.
+
+    Returns:
+    - list: ``(document, row)`` pairs, ``row`` holding the other ``columns``.
+    """
+    if not fields:
+        return [(row[column], row) for row in queryset.values(column, *columns)]
+    keys = {f"{column}__{name}": name for name in fields}
+    return [
+        ({name: row[key] for key, name in keys.items()}, row)
+        for row in queryset.values(
+            *columns, **{key: JSONKey(name, column) for key, name in keys.items()}
+        )
+    ]
+
+
+def project_orders(order_ids):
+    """
+    Render the projection rows of ``order_ids`` from the order tables.
+
+    Costs one query for the orders with their payments, one for their lines
+    and one upsert, however many orders are given. Call it in the
+    transaction that wrote the orders or payments, so reads see the write as
+    soon as it commits. Rows of deleted orders go with them by cascade.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    orders = list(
+        Order.objects.filter(pk__in=set(order_ids))
+        .select_related("payment")
+        .order_by("pk")
+    )
+    if not orders:
+        return 0
+    payments = [payment for payment in map(_payment_of, orders) if payment]
+    payment_documents = {
+        payment["order"]: payment
+        for payment in PaymentSerializer(payments, many=True).data
+    }
+    projections = []
+    for order, document in zip(orders, render_orders(orders)):
+        payment = _payment_of(order)
+        projections.append(
+            OrderProjection(
+                order=order,
+                user_id=order.user_id,
+                document=document,
+                payment=payment_documents.get(order.pk),
+                payment_status=payment and payment.payment_status,
+                total_price=order.total_price,
+                order_version=order.version,
+                created_at=order.created_at,
+                source_updated_at=(
+                    max(order.updated_at, payment.updated_at)
+                    if payment
+                    else order.updated_at
+                ),
+            )
+        )
+    OrderProjection.objects.bulk_create(
+        projections,
+        update_conflicts=True,
+        unique_fields=["order"],
+        update_fields=PROJECTED_FIELDS,
+    )
+    return len(projections)
+
+
+def _payment_of(order):
+    try:
+        return order.payment
+    except Payment.DoesNotExist:
+        return None
+
+
+def catch_up_projections(batch_size=500):
+    """
+    Project orders written since the projection was last brought up to date.
+
+    Catches writes made outside the API, such as in the admin or a shell,
+    and anything lost to a crash. The watermark is the newest
+    ``source_updated_at`` in the projection, less
+    ``ORDER_PROJECTION_CATCH_UP_OVERLAP`` seconds for transactions that
+    committed after a later write was projected. Projecting is idempotent,
+    so the overlap only costs time. An empty projection is filled from
+    scratch. Cached order histories of the users touched are retired.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    watermark = OrderProjection.objects.aggregate(Max("source_updated_at"))[
+        "source_updated_at__max"
+    ]
+    orders = Order.objects.all()
+    payments = Payment.objects.all()
+    if watermark is not None:
+        since = watermark - timedelta(
+            seconds=settings.ORDER_PROJECTION_CATCH_UP_OVERLAP
+        )
+        orders = orders.filter(updated_at__gte=since)
+        payments = payments.filter(updated_at__gte=since)
+    return _project_in_batches(
+        orders, "pk", "user_id", batch_size
+    ) + _project_in_batches(payments, "order_id", "order__user_id", batch_size)
+
+
+def rebuild_projections(batch_size=500):
+    """
+    Render every order again, ignoring the watermark.
+
+    Rows are replaced in place, batch by batch, so reads keep being served
+    while the rebuild runs, and each batch retires the cached order
+    histories of its users.
+
+    Returns:
+    - int: Number of rows written.
+    """
+    return _project_in_batches(Order.objects.all(), "pk", "user_id", batch_size)
+
+
+def _project_in_batches(queryset, order_column, user_column, batch_size):
+    projected = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", order_column, user_column)[:batch_size]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            projected += project_orders(order_id for _, order_id, _ in rows)
+            # Cached histories were rendered from the rows just replaced.
+            invalidate_order_history(user_id for _, _, user_id in rows)
+        last_pk = rows[-1][0]
+    return projected
@@ -0,0 +1,143 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from shopping_cart.models import User
+from shopping_cart.serializer import ProvisionedUserSerializer
+
+PROVISIONING_BATCH_SIZE = 1000
+INSERT_CHUNK_SIZE = 500
+
+
+def provision_users(rows, batch_size=PROVISIONING_BATCH_SIZE, workers=None):
+    """
+    Register many users at once, reporting the outcome of each one.
+
+    ``rows`` is an iterable of user dicts with the fields of the registration
+    API. Rows are handled ``batch_size`` at a time: each row is validated on
+    its own, usernames and emails are checked against existing users with
+    one query per batch (and against the rest of the batch), the passwords
+    are hashed in parallel over ``workers`` processes (all CPUs by default;
+    with 1 they are hashed in this process), and the users are inserted
+    with chunked bulk writes in one transaction per batch. If a concurrent
+    registration makes a batch fail, its rows are inserted one at a time.
+    Failed rows do not affect the others, so a re-run only adds the rows
+    still missing.
+
+    Returns:
+    - list: One result dict per row, in row order, with ``status`` (201,
+      400 or 409) and either the new ``id`` or the ``errors``.
+    """
+    results = []
+    batch = []
+    with _password_hasher(workers) as hash_passwords:
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                results.extend(_provision_batch(batch, hash_passwords))
+                batch = []
+        if batch:
+            results.extend(_provision_batch(batch, hash_passwords))
+    return results
+
+
+@contextmanager
+def _password_hasher(workers):
+    """
+    Yield a function hashing a list of passwords over ``workers`` processes.
+    """
+    if workers == 1:
+        yield lambda passwords: [make_password(password) for password in passwords]
+        return
+    workers = workers or os.cpu_count()
+    # Workers only hash, but need the settings to pick the hasher.
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        yield lambda passwords: list(
+            pool.map(
+                make_password,
+                passwords,
+                chunksize=max(1, len(passwords) // (workers * 4)),
+            )
+        )
+
+
+def _provision_batch(rows, hash_passwords):
+    results = [{} for _ in rows]
+    valid = {}
+    for index, row in enumerate(rows):
+        serializer = ProvisionedUserSerializer(data=row)
+        if not serializer.is_valid():
+            results[index].update(status=400, errors=serializer.errors)
+            continue
+        data = dict(
+            serializer.validated_data,
+            username=User.normalize_username(serializer.validated_data["username"]),
+            email=User.objects.normalize_email(serializer.validated_data["email"]),
+        )
+        try:
+            validate_password(data["password"], user=User(**data))
+        except ValidationError as err:
+            results[index].update(status=400, errors={"password": err.messages})
+            continue
+        valid[index] = data
+
+    taken = User.all_objects.filter(
+        Q(username__in=[data["username"] for data in valid.values()])
+        | Q(email__in=[data["email"] for data in valid.values()])
+    ).values_list("username", "email")
+    taken_usernames = set()
+    taken_emails = set()
+    for username, email in taken:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    for index, data in list(valid.items()):
+        errors = {}
+        if data["username"] in taken_usernames:
+            errors["username"] = ["A user with that username already exists."]
+        if data["email"] in taken_emails:
+            errors["email"] = ["A user with that email already exists."]
+        # Later rows repeating a username or email of this batch lose too.
+        taken_usernames.add(data["username"])
+        taken_emails.add(data["email"])
+        if errors:
+            results[index].update(status=409, errors=errors)
+            del valid[index]
+
+    if not valid:
+        return results
+    hashed = hash_passwords([data["password"] for data in valid.values()])
+    users = [
+        User(**dict(data, password=password))
+        for data, password in zip(valid.values(), hashed)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=INSERT_CHUNK_SIZE)
+    except IntegrityError:
+        # Someone registered one of the names since the check; insert the
+        # rows one at a time so only the conflicting ones fail.
+        for index, user in zip(valid, users):
+            user.pk = None
+            try:
+                with transaction.atomic():
+                    User.objects.bulk_create([user])
+            except IntegrityError:
+                results[index].update(
+                    status=409,
+                    errors={
+                        "non_field_errors": ["Conflicted with a concurrent write."]
+                    },
+                )
+                continue
+            results[index].update(status=201, id=user.pk)
+        return results
+    for index, user in zip(valid, users):
+        results[index].update(status=201, id=user.pk)
+    return results
@@ -0,0 +1,238 @@
+import os
+import tempfile
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from shopping_cart.models import Order, OrderItem, Product
+
+SCAN_CHUNK_SIZE = 50000
+
+
+class RelatedProductsIndex:
+    """
+    In-process copy of the precomputed "frequently bought together" index.
+
+    For every product the index holds up to ``RECOMMENDATION_TOP_K`` other
+    products, best first, with the number of orders they shared, as three
+    CSR-style arrays: ``indptr`` delimits each product's run of
+    ``indices`` (product ids) and ``scores``. It is read from
+    ``RECOMMENDATION_INDEX_PATH`` on first use and again whenever
+    ``refresh_recommendations`` replaces the file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._arrays = None
+        self._loaded_mtime = None
+
+    def _ensure_loaded(self):
+        try:
+            mtime = os.stat(settings.RECOMMENDATION_INDEX_PATH).st_mtime_ns
+        except FileNotFoundError:
+            self._arrays, self._loaded_mtime = None, None
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with np.load(settings.RECOMMENDATION_INDEX_PATH) as stored:
+            self._arrays = (
+                stored["related_indptr"],
+                stored["related_indices"],
+                stored["related_scores"],
+            )
+        self._loaded_mtime = mtime
+
+    def warm(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    def related(self, product_id, limit=10):
+        """
+        Return up to ``limit`` ``(product_id, score)`` pairs, best first.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            arrays = self._arrays
+        if arrays is None:
+            return []
+        indptr, indices, scores = arrays
+        if not 0 <= product_id < len(indptr) - 1:
+            return []
+        start = indptr[product_id]
+        end = min(indptr[product_id + 1], start + limit)
+        return list(zip(indices[start:end].tolist(), scores[start:end].tolist()))
+
+
+related_products_index = RelatedProductsIndex()
+
+
+def refresh_recommendations(rebuild=False, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Fold orders placed since the last refresh into the recommendation index.
+
+    The stored product-by-product co-occurrence counts are extended with
+    the baskets of orders created since the previous refresh started, less
+    ``RECOMMENDATION_REFRESH_OVERLAP`` seconds for transactions that
+    committed after it ran, read in chunks of whole orders, and the top-k
+    index is recomputed from them. Orders of the overlap that were already
+    counted are stored with the index and skipped. Items of orders that
+    were already counted and later edited are only picked up by a
+    ``rebuild``, which counts every order again.
+
+    Returns:
+    - int: Number of orders counted.
+    """
+    # Only needed to build the index; serving it takes NumPy alone.
+    from scipy import sparse
+
+    started = datetime.now(timezone.utc)
+    overlap = timedelta(seconds=settings.RECOMMENDATION_REFRESH_OVERLAP)
+    size = (Product.all_objects.aggregate(Max("pk"))["pk__max"] or 0) + 1
+    counts = sparse.csr_matrix((size, size), dtype=np.int32)
+    created_since = None
+    skipped_order_ids = np.empty(0, dtype=np.int64)
+    if not rebuild and os.path.exists(settings.RECOMMENDATION_INDEX_PATH):
+        with np.load(settings.RECOMMENDATION_INDEX_PATH) as stored:
+            stored_counts = sparse.csr_matrix(
+                (
+                    stored["counts_data"],
+                    stored["counts_indices"],
+                    stored["counts_indptr"],
+                ),
+                shape=tuple(stored["counts_shape"]),
+            )
+            created_since = _from_timestamp(stored["refreshed_at"]) - overlap
+            skipped_order_ids = stored["recent_order_ids"]
+        stored_counts.resize((size, size))
+        counts = stored_counts
+    counted = 0
+    counted_order_ids = [skipped_order_ids]
+    for items in _scan_baskets(created_since, chunk_size):
+        items = items[~np.isin(items[:, 0], skipped_order_ids)]
+        if not len(items):
+            continue
+        # Products created since the size was taken.
+        if items[:, 1].max() >= size:
+            size = int(items[:, 1].max()) + 1
+            counts.resize((size, size))
+        counts = counts + _co_occurrences(items, size)
+        order_ids = np.unique(items[:, 0])
+        counted += len(order_ids)
+        counted_order_ids.append(order_ids)
+    # Counted orders the next refresh scans again.
+    recent_order_ids = np.intersect1d(
+        np.fromiter(
+            Order.objects.filter(created_at__gte=started - overlap).values_list(
+                "pk", flat=True
+            ),
+            dtype=np.int64,
+        ),
+        np.concatenate(counted_order_ids),
+    )
+    _save(counts.tocsr(), started, recent_order_ids)
+    return counted
+
+
+def _scan_baskets(created_since, chunk_size):
+    """
+    Yield ``(order_id, product_id)`` arrays of the items of whole orders
+    created since ``created_since`` (every order if None), in order id
+    order.
+    """
+    pending = OrderItem.objects.order_by("order_id").values_list(
+        "order_id", "product_id"
+    )
+    if created_since is not None:
+        pending = pending.filter(order__created_at__gte=created_since)
+    last_order_id = 0
+    while True:
+        items = np.array(
+            list(pending.filter(order_id__gt=last_order_id)[:chunk_size]),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        if not len(items):
+            return
+        if len(items) == chunk_size:
+            # The last order may go on past the chunk; leave it to the next
+            # one, unless it is the only order in the chunk.
+            complete = items[:, 0] < items[-1, 0]
+            if complete.any():
+                items = items[complete]
+            else:
+                items = np.array(
+                    list(pending.filter(order_id=items[-1, 0])), dtype=np.int64
+                )
+        yield items
+        last_order_id = items[-1, 0]
+
+
+def _from_timestamp(microseconds):
+    return datetime.fromtimestamp(int(microseconds) / 1_000_000, timezone.utc)
+
+
+def _co_occurrences(items, size):
+    """
+    Count, for every pair of products, the orders in ``items`` that hold both.
+    """
+    from scipy import sparse
+
+    _, rows = np.unique(items[:, 0], return_inverse=True)
+    baskets = sparse.csr_matrix(
+        (np.ones(len(items), dtype=np.int32), (rows, items[:, 1])),
+        shape=(rows.max() + 1, size),
+    )
+    # A product listed twice in one order still counts once.
+    baskets.data[:] = 1
+    counts = (baskets.T @ baskets).tocsr()
+    counts = counts - sparse.diags(counts.diagonal(), dtype=np.int32, format="csr")
+    counts.eliminate_zeros()
+    return counts
+
+
+def _top_k(counts, k):
+    """
+    Keep the ``k`` highest counts of every row, best first, ties broken by
+    the lower product id.
+    """
+    row_lengths = np.diff(counts.indptr)
+    rows = np.repeat(np.arange(counts.shape[0]), row_lengths)
+    order = np.lexsort((counts.indices, -counts.data, rows))
+    rank = np.arange(len(order)) - counts.indptr[rows[order]]
+    keep = order[rank < k]
+    indptr = np.zeros(counts.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.minimum(row_lengths, k), out=indptr[1:])
+    return (
+        indptr,
+        counts.indices[keep].astype(np.int32),
+        counts.data[keep].astype(np.int32),
+    )
+
+
+def _save(counts, refreshed_at, recent_order_ids):
+    related_indptr, related_indices, related_scores = _top_k(
+        counts, settings.RECOMMENDATION_TOP_K
+    )
+    path = settings.RECOMMENDATION_INDEX_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Written next to the index and moved over it, so workers never load a
+    # partly written file.
+    with tempfile.NamedTemporaryFile(
+        dir=path.parent, suffix=".npz", delete=False
+    ) as stored:
+        np.savez(
+            stored,
+            counts_data=counts.data.astype(np.int32),
+            counts_indices=counts.indices.astype(np.int32),
+            counts_indptr=counts.indptr.astype(np.int64),
+            counts_shape=np.array(counts.shape, dtype=np.int64),
+            refreshed_at=np.int64(refreshed_at.timestamp() * 1_000_000),
+            recent_order_ids=recent_order_ids.astype(np.int64),
+            related_indptr=related_indptr,
+            related_indices=related_indices,
+            related_scores=related_scores,
+        )
+    os.chmod(stored.name, 0o644)
+    os.replace(stored.name, path)
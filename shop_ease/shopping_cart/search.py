@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from shopping_cart.models import Product
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_tokens(text):
+    """
+    Split text into lowercase ASCII word tokens, dropping accents.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = text.encode("ascii", "ignore").decode("ascii").lower()
+    return TOKEN_RE.findall(text)
+
+
+class ProductNameIndex:
+    """
+    In-process prefix index over the tokens of live product names.
+
+    Entries are ``(token, product_name, product_id)`` tuples kept in one
+    sorted list, so all tokens starting with a prefix form a contiguous run
+    found by binary search. The index is built on first use, kept current
+    by ``upsert``/``remove`` from the product signals, and rebuilt after
+    ``PRODUCT_INDEX_TTL`` seconds to pick up writes made by other processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._names = {}
+        self._built_at = None
+
+    def _build(self):
+        entries = []
+        names = {}
+        for product_id, product_name in Product.objects.values_list(
+            "id", "product_name"
+        ):
+            names[product_id] = product_name
+            entries.extend(
+                (token, product_name, product_id)
+                for token in set(normalize_tokens(product_name))
+            )
+        entries.sort()
+        self._entries = entries
+        self._names = names
+        self._built_at = time.monotonic()
+
+    def warm(self):
+        with self._lock:
+            self._ensure_built()
+
+    def _ensure_built(self):
+        if (
+            self._built_at is None
+            or time.monotonic() - self._built_at > settings.PRODUCT_INDEX_TTL
+        ):
+            self._build()
+
+    def _discard(self, product_id):
+        product_name = self._names.pop(product_id, None)
+        if product_name is None:
+            return
+        for token in set(normalize_tokens(product_name)):
+            entry = (token, product_name, product_id)
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def upsert(self, product_id, product_name):
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(product_id)
+            self._names[product_id] = product_name
+            for token in set(normalize_tokens(product_name)):
+                insort(self._entries, (token, product_name, product_id))
+
+    def remove(self, product_id):
+        with self._lock:
+            if self._built_at is not None:
+                self._discard(product_id)
+
+    def search(self, query, limit=10):
+        """
+        Return up to ``limit`` ``(product_id, product_name)`` matches.
+
+        Every query token must prefix some token of the product name; the
+        last query token drives the index scan. Matches come back in token
+        order, so exact and shorter token matches rank first.
+        """
+        tokens = normalize_tokens(query)
+        if not tokens:
+            return []
+        prefix, others = tokens[-1], tokens[:-1]
+        results = []
+        seen = set()
+        with self._lock:
+            self._ensure_built()
+            position = bisect_left(self._entries, (prefix,))
+            while position < len(self._entries) and len(results) < limit:
+                token, product_name, product_id = self._entries[position]
+                if not token.startswith(prefix):
+                    break
+                position += 1
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+                if others:
+                    name_tokens = normalize_tokens(product_name)
+                    if not all(
+                        any(name_token.startswith(other) for name_token in name_tokens)
+                        for other in others
+                    ):
+                        continue
+                results.append((product_id, product_name))
+        return results
+
+
+product_name_index = ProductNameIndex()
@@ -1,18 +1,68 @@
 from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
 from django.contrib.auth.hashers import make_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 
 from shopping_cart.models import Order, Payment, Product, User
+from shopping_cart.tracing import TracedListSerializer, TracedSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+def parse_fields_param(value, allowed):
+    """
+    Parse a comma separated ``fields`` query parameter against an allow-list.
+
+    Returns:
+    - list: The requested field names, or None if no fields were requested.
+
+    Raises:
+    - ValidationError: If any requested field is not in ``allowed``.
+    """
+    if value is None:
+        return None
+    fields = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown or not fields:
+        raise serializers.ValidationError(
+            {"fields": f"Allowed fields are: {', '.join(allowed)}"}
+        )
+    return fields
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking an optional ``fields`` argument that limits the
+    output to a subset of ``Meta.fields``.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class UserSerializer(TracedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for User model
     """
 
+    # Uniqueness spans soft-deleted users too, since the columns are unique.
+    username = serializers.CharField(
+        max_length=150,
+        validators=[
+            UnicodeUsernameValidator(),
+            UniqueValidator(queryset=User.all_objects.all()),
+        ],
+    )
+    email = serializers.EmailField(
+        validators=[UniqueValidator(queryset=User.all_objects.all())],
+    )
+
     class Meta:
         model = User
+        list_serializer_class = TracedListSerializer
         fields = [
             "id",
             "username",
@@ -46,23 +96,52 @@ class UserSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProvisionedUserSerializer(UserSerializer):
+    """
+    Serializer validating users for bulk provisioning.
+
+    Username and email uniqueness is left out here and checked for a whole
+    batch at once by shopping_cart.provisioning.
+    """
+
+    username = serializers.CharField(
+        max_length=150, validators=[UnicodeUsernameValidator()]
+    )
+    email = serializers.EmailField()
+
+
+class ProductSerializer(
+    TracedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for Product model
     """
 
     class Meta:
         model = Product
-        fields = ["id", "product_name", "description", "price", "is_delete"]
+        list_serializer_class = TracedListSerializer
+        fields = [
+            "id",
+            "product_name",
+            "description",
+            "price",
+            "stock",
+            "is_delete",
+            "version",
+        ]
+        read_only_fields = ["version"]
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(
+    TracedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer
+):
     """
     Serializer for Payment model
     """
 
     class Meta:
         model = Payment
+        list_serializer_class = TracedListSerializer
         fields = [
             "id",
             "order",
@@ -70,4 +149,6 @@ class PaymentSerializer(serializers.ModelSerializer):
             "transaction_id",
             "amount_paid",
             "payment_status",
+            "version",
         ]
+        read_only_fields = ["version"]
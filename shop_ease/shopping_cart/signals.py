@@ -0,0 +1,43 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shopping_cart.caching import (
+    CATALOG_VERSION,
+    PRICING_RULES_VERSION,
+    bump_version,
+    invalidate_products,
+)
+from shopping_cart.models import PricingRule, Product
+from shopping_cart.search import product_name_index
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_products([instance.pk])
+    # After the commit, so nothing re-caches the old row under the new version.
+    transaction.on_commit(partial(bump_version, CATALOG_VERSION))
+
+
+@receiver(post_save, sender=Product)
+def index_product_name(sender, instance, **kwargs):
+    if instance.is_delete:
+        transaction.on_commit(partial(product_name_index.remove, instance.pk))
+    else:
+        transaction.on_commit(
+            partial(product_name_index.upsert, instance.pk, instance.product_name)
+        )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_name(sender, instance, **kwargs):
+    transaction.on_commit(partial(product_name_index.remove, instance.pk))
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+def invalidate_pricing_rules(sender, instance, **kwargs):
+    transaction.on_commit(partial(bump_version, PRICING_RULES_VERSION))
@@ -1,3 +1,1795 @@
-from django.test import TestCase
+import importlib
+import json
+import re
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.core.cache import cache, caches
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shopping_cart.archive import archive_settled_orders, compact_soft_deleted
+from shopping_cart.caching import (
+    CATALOG_VERSION,
+    LRUCache,
+    get_cached_products,
+    get_version,
+    order_history_cache,
+    order_history_version,
+)
+from shopping_cart.cart import Cart
+from shopping_cart.concurrency import VersionConflict
+from shopping_cart.inventory import (
+    OutOfStock,
+    commit_reservations,
+    release_expired_reservations,
+    reserve_stock,
+)
+from shopping_cart.models import (
+    ArchivedOrder,
+    Order,
+    OrderItem,
+    Payment,
+    PricingRule,
+    Product,
+    StockReservation,
+    User,
+)
+from shopping_cart.orders import create_orders_in_bulk, replace_order_items
+from shopping_cart.pricing import get_compiled_rules, quote_order
+from shopping_cart.projection import catch_up_projections, project_orders
+from shopping_cart.provisioning import provision_users
+from shopping_cart.recommendations import (
+    refresh_recommendations,
+    related_products_index,
+)
+from shopping_cart.search import product_name_index
+from shopping_cart.tracing import (
+    SPAN_KIND_SERVER,
+    STATUS_ERROR,
+    STATUS_OK,
+    Trace,
+    TraceExporter,
+    parse_traceparent,
+)
+from shopping_cart.urls import urlpatterns
+from shopping_cart.warmup import warm_up
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", price="10.00", stock=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        caches["carts"].clear()
+
+    def order(self, quantity):
+        return self.client.post(
+            "/api/order/",
+            {"products": [{"product_id": self.product.id, "quantity": quantity}]},
+            format="json",
+        )
+
+    def test_order_reserves_stock(self):
+        self.assertEqual(self.order(2).status_code, 201)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.HELD)
+
+    def test_oversell_is_rejected_and_rolled_back(self):
+        self.assertEqual(self.order(4).status_code, 409)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+        self.assertFalse(Order.objects.exists())
+
+    def test_quantities_below_one_are_rejected(self):
+        self.assertEqual(self.order(0).status_code, 400)
+        response = self.client.post(
+            "/api/order/batch/",
+            {
+                "orders": [
+                    {"products": [{"product_id": self.product.id, "quantity": -5}]},
+                    {"products": [{"product_id": self.product.id, "quantity": 1}]},
+                ]
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 207, response.content)
+        self.assertEqual(
+            [result["status"] for result in response.data["results"]], [400, 201]
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_malformed_order_lines_are_rejected(self):
+        for products in ("abc", {"product_id": self.product.id}, [1], ["abc"]):
+            with self.subTest(products=products):
+                for path in ("/api/order/", "/api/order/checkout/"):
+                    response = self.client.post(
+                        path,
+                        {
+                            "products": products,
+                            "payment_method": "UPI",
+                            "amount_paid": "10.00",
+                        },
+                        format="json",
+                    )
+                    self.assertEqual(response.status_code, 400, response.content)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_rejects_negative_quantity(self):
+        response = self.client.post(
+            "/api/order/checkout/",
+            {
+                "products": [{"product_id": self.product.id, "quantity": -1}],
+                "payment_method": "UPI",
+                "amount_paid": "-10.00",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400, response.content)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(Payment.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_cart_never_holds_zero_quantities(self):
+        line = {"product_id": self.product.id, "quantity": 0}
+        response = self.client.post("/api/cart/", line, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.client.post("/api/cart/", dict(line, quantity=2), format="json")
+        response = self.client.put("/api/cart/", line, format="json")
+        self.assertEqual(response.data["products"], [])
+        response = self.client.post("/api/cart/checkout/", format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    @override_settings(CART_MAX_QUANTITY=10, CART_MAX_LINES=1)
+    def test_cart_rejects_unknown_products_and_oversized_lines(self):
+        line = {"product_id": self.product.id, "quantity": 6}
+        response = self.client.post("/api/cart/", dict(line, product_id=999999))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post("/api/cart/", dict(line, quantity=10**20))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/api/cart/", line).status_code, 200)
+        self.assertEqual(self.client.post("/api/cart/", line).status_code, 400)
+        other = Product.objects.create(product_name="Rope", price="4.00")
+        response = self.client.post("/api/cart/", dict(line, product_id=other.id))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Cart(self.user).items, {self.product.id: 6})
+
+    def test_concurrent_cart_adds_are_all_kept(self):
+        def add():
+            for _ in range(10):
+                Cart(self.user).add(self.product.id, 1)
+
+        threads = [threading.Thread(target=add) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Cart(self.user).items, {self.product.id: 40})
+
+    def test_checkout_drops_deleted_products_from_cart(self):
+        other = Product.objects.create(product_name="Rope", price="4.00")
+        self.client.post("/api/cart/", {"product_id": self.product.id})
+        self.client.post("/api/cart/", {"product_id": other.id})
+        other.is_delete = True
+        other.save()
+        response = self.client.post("/api/cart/checkout/", format="json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["missing"], [other.id])
+        self.assertFalse(Order.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/cart/checkout/", format="json")
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(Cart(self.user).items, {})
+
+    def test_untracked_product_is_not_limited(self):
+        self.product.stock = None
+        self.product.save()
+        self.assertEqual(self.order(50).status_code, 201)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_failed_payment_releases_stock(self):
+        self.order(2)
+        order = Order.objects.get()
+        response = self.client.post(
+            "/api/payment/",
+            {"order_id": order.id, "payment_method": "UPI", "amount_paid": "1.00"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_completed_payment_commits_stock(self):
+        self.order(2)
+        order = Order.objects.get()
+        response = self.client.post(
+            "/api/payment/",
+            {
+                "order_id": order.id,
+                "payment_method": "UPI",
+                "amount_paid": order.total_price,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            StockReservation.objects.get().status, StockReservation.COMMITTED
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_paid_orders_cannot_be_edited(self):
+        self.order(2)
+        order = Order.objects.get()
+        self.client.post(
+            "/api/payment/",
+            {
+                "order_id": order.id,
+                "payment_method": "UPI",
+                "amount_paid": order.total_price,
+            },
+            format="json",
+        )
+        response = self.client.put(
+            "/api/order/",
+            {
+                "order_id": order.id,
+                "products": [{"product_id": self.product.id, "quantity": 1}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 409, response.content)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(OrderItem.objects.get().quantity, 2)
+        self.assertEqual(
+            StockReservation.objects.get().status, StockReservation.COMMITTED
+        )
+
+    def test_payment_retakes_released_stock(self):
+        self.order(2)
+        order = Order.objects.get()
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(1))
+        release_expired_reservations()
+        commit_reservations(order)
+        commit_reservations(order)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(
+            StockReservation.objects.get().status, StockReservation.COMMITTED
+        )
+
+    def test_expired_reservations_are_released(self):
+        self.order(2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(1))
+        self.assertEqual(release_expired_reservations(), 1)
+        self.assertEqual(release_expired_reservations(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+
+class ConcurrencyTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", price="10.00"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def update_product(self, if_match, price):
+        return self.client.patch(
+            "/api/product/",
+            {"id": self.product.id, "price": price},
+            format="json",
+            HTTP_IF_MATCH=if_match,
+        )
+
+    def test_if_match_guards_product_updates(self):
+        response = self.update_product('"1"', "11.00")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], '"2"')
+        response = self.update_product('"1"', "12.00")
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.data["version"], 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, Decimal("11.00"))
+        self.assertEqual(self.update_product('"1", "2"', "13.00").status_code, 200)
+        self.assertEqual(self.update_product("*", "14.00").status_code, 200)
+
+    def test_stale_save_raises_conflict(self):
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        first.price = "11.00"
+        first.save()
+        second.price = "12.00"
+        with self.assertRaises(VersionConflict), transaction.atomic():
+            second.save()
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.price, self.product.version), (11, 2))
+
+    def test_payment_update_needs_a_payment(self):
+        line = {"product_id": self.product.id, "quantity": 1}
+        self.client.post("/api/order/", {"products": [line]}, format="json")
+        payment = {"payment_method": "UPI", "amount_paid": "10.00"}
+        response = self.client.put(
+            "/api/payment/",
+            dict(payment, order_id=Order.objects.get().id),
+            format="json",
+            HTTP_IF_MATCH='"1"',
+        )
+        self.assertEqual(response.status_code, 404, response.content)
+        self.assertEqual(response.data["error"], "Payment not found")
+        response = self.client.put(
+            "/api/payment/", dict(payment, order_id=999999), format="json"
+        )
+        self.assertEqual(response.status_code, 404, response.content)
+
+    def test_order_update_follows_fetched_etag(self):
+        line = {"product_id": self.product.id, "quantity": 1}
+        self.client.post("/api/order/", {"products": [line]}, format="json")
+        order = Order.objects.get()
+        etag = self.client.get("/api/order/", {"order_id": order.pk})["ETag"]
+        update = {"order_id": order.pk, "products": [dict(line, quantity=2)]}
+        response = self.client.put(
+            "/api/order/", update, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        response = self.client.put(
+            "/api/order/", update, format="json", HTTP_IF_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 412)
+
+    def test_lost_update_race_returns_conflict(self):
+        line = {"product_id": self.product.id, "quantity": 1}
+        self.client.post("/api/order/", {"products": [line]}, format="json")
+        order = Order.objects.get()
+
+        def replace_during_concurrent_update(order_obj, order_lines):
+            # Another request saves the order between this one's read and write.
+            Order.objects.filter(pk=order_obj.pk).update(version=F("version") + 1)
+            replace_order_items(order_obj, order_lines)
+
+        with mock.patch(
+            "shopping_cart.views.replace_order_items",
+            replace_during_concurrent_update,
+        ):
+            response = self.client.put(
+                "/api/order/",
+                {"order_id": order.pk, "products": [dict(line, quantity=2)]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            list(order.orderitem_set.values_list("quantity", flat=True)), [1]
+        )
+
+
+class ArchiveTestCase(TestCase):
+    def test_compaction_keeps_users_with_archived_orders(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            "/api/order/checkout/",
+            {
+                "products": [{"product_id": product.id, "quantity": 1}],
+                "payment_method": "UPI",
+                "amount_paid": "10.00",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(archive_settled_orders(older_than_days=0), 1)
+        User.all_objects.filter(pk=user.pk).update(is_delete=True)
+
+        self.assertEqual(compact_soft_deleted(User, older_than_days=0), 0)
+        self.assertEqual(ArchivedOrder.objects.filter(user=user).count(), 1)
+
+    def test_archived_order_is_read_with_include_archived(self):
+        # Rolled back users hand out the same ids again.
+        caches["versions"].clear()
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post(
+            "/api/order/checkout/",
+            {
+                "products": [{"product_id": product.id, "quantity": 1}],
+                "payment_method": "UPI",
+                "amount_paid": "10.00",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        order_id = response.data["order_id"]
+        self.assertEqual(archive_settled_orders(older_than_days=0), 1)
+
+        response = client.get("/api/order/", {"order_id": order_id})
+        self.assertEqual(response.status_code, 404)
+        response = client.get(
+            "/api/order/", {"order_id": order_id, "include_archived": "true"}
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        order_data = response.json()[0]
+        self.assertEqual(order_data["order_id"], order_id)
+        self.assertTrue(order_data["is_archived"])
+        self.assertEqual(order_data["product_details"][0]["product_id"], product.id)
+        response = client.get(
+            "/api/order/", {"order_id": order_id + 1, "include_archived": "true"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class ProductFilterTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for price in ("5.00", "15.00", "150.00"):
+            Product.objects.create(product_name=f"Glove {price}", price=price)
+        self.client = APIClient()
+
+    def test_price_filters(self):
+        response = self.client.get(
+            "/api/product/", {"minimum_price": "10", "maximum_price": "100"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["price"] for row in response.json()], ["15.00"])
+        response = self.client.get("/api/product/facets/", {"minimum_price": "10"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["total"], 2)
+
+    def test_malformed_prices_are_rejected(self):
+        for path in ("/api/product/", "/api/product/facets/"):
+            for params in ({"minimum_price": "abc"}, {"maximum_price": "NaN"}):
+                with self.subTest(path=path, params=params):
+                    response = self.client.get(path, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(next(iter(params)), response.json())
+
+    def test_lookup_by_ids(self):
+        caches["products"].clear()
+        first, second, _ = Product.objects.order_by("pk").values_list("pk", flat=True)
+        ids = f"{second},{first},{second},-1,999999"
+        response = self.client.get("/api/product/", {"ids": ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [product["id"] for product in response.json()["products"]],
+            [second, first],
+        )
+        self.assertEqual(response.json()["missing"], [-1, 999999])
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/product/", {"ids": f"{first},{second}"})
+        self.assertEqual(len(response.json()["products"]), 2)
+
+        product = Product.objects.get(pk=first)
+        product.product_name = "Renamed"
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        response = self.client.get("/api/product/", {"ids": str(first)})
+        self.assertEqual(response.json()["products"][0]["product_name"], "Renamed")
+
+
+class SparseFieldsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["products"].clear()
+        # Rolled back users hand out the same ids again.
+        caches["versions"].clear()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", price="10.00"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.client.post(
+            "/api/order/",
+            {"products": [{"product_id": self.product.id, "quantity": 1}]},
+            format="json",
+        )
+        self.order = Order.objects.get()
+        self.client.post(
+            "/api/payment/",
+            {
+                "order_id": self.order.id,
+                "payment_method": "UPI",
+                "amount_paid": self.order.total_price,
+            },
+            format="json",
+        )
+
+    def test_requested_fields_are_returned(self):
+        response = self.client.get("/api/product/", {"fields": "id,price"})
+        self.assertEqual(response.json(), [{"id": self.product.id, "price": "10.00"}])
+        response = self.client.get(
+            "/api/product/", {"ids": str(self.product.id), "fields": "product_name"}
+        )
+        self.assertEqual(
+            response.json()["products"], [{"product_name": "Boxing Glove"}]
+        )
+        response = self.client.get("/api/order/", {"fields": "order_id, total_price"})
+        self.assertEqual(
+            response.json(), [{"order_id": self.order.id, "total_price": 10.0}]
+        )
+        response = self.client.get("/api/payment/", {"fields": "order,payment_status"})
+        self.assertEqual(
+            response.json(), [{"order": self.order.id, "payment_status": "Completed"}]
+        )
+
+    def test_unknown_fields_are_rejected(self):
+        for path, fields in (
+            ("/api/product/", "id,password"),
+            ("/api/product/", ""),
+            ("/api/order/", "price"),
+            ("/api/payment/", "id,user"),
+        ):
+            with self.subTest(path=path, fields=fields):
+                response = self.client.get(path, {"fields": fields})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("fields", response.json())
+
+
+class AutocompleteTestCase(TestCase):
+    def suggest(self, query):
+        response = APIClient().get("/api/product/autocomplete/", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return [match["product_name"] for match in response.json()]
+
+    def test_index_follows_product_writes(self):
+        self.suggest("glove")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(product_name="Zebra Mitt", price="5.00")
+        self.assertEqual(self.suggest("zeb"), ["Zebra Mitt"])
+
+        product.product_name = "Quokka Mitt"
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+        # Not before the rename commits.
+        self.assertEqual(self.suggest("zeb"), ["Zebra Mitt"])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.suggest("zeb"), [])
+        self.assertEqual(self.suggest("quokka m"), ["Quokka Mitt"])
+
+        product.is_delete = True
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.suggest("quokka"), [])
+
+
+class RecommendationTestCase(TestCase):
+    def setUp(self):
+        index_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(index_dir.cleanup)
+        index_settings = override_settings(
+            RECOMMENDATION_INDEX_PATH=Path(index_dir.name) / "related_products.npz"
+        )
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.glove, self.wrap = (
+            Product.objects.create(product_name=name, price="10.00")
+            for name in ("Boxing Glove", "Wrap")
+        )
+        self.basket = [
+            {"product_id": self.glove.id, "quantity": 1},
+            {"product_id": self.wrap.id, "quantity": 1},
+        ]
+
+    def test_late_orders_are_counted_once(self):
+        create_orders_in_bulk(
+            [{"products": self.basket}, {"products": self.basket}], self.user
+        )
+        early, late = Order.objects.order_by("pk")
+        # The earlier order's transaction has not committed yet.
+        early_items = list(OrderItem.objects.filter(order=early))
+        OrderItem.objects.filter(order=early).delete()
+        self.assertEqual(refresh_recommendations(), 1)
+
+        OrderItem.objects.bulk_create(early_items)
+        self.assertEqual(refresh_recommendations(), 1)
+        self.assertEqual(refresh_recommendations(), 0)
+        self.assertEqual(
+            related_products_index.related(self.glove.id), [(self.wrap.id, 2)]
+        )
+
+        Order.objects.filter(pk__in=[early.pk, late.pk]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        create_orders_in_bulk([{"products": self.basket}], self.user)
+        self.assertEqual(refresh_recommendations(), 1)
+        self.assertEqual(refresh_recommendations(rebuild=True), 3)
+        self.assertEqual(
+            related_products_index.related(self.glove.id), [(self.wrap.id, 3)]
+        )
+
+
+class OrderSearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        for quantity in (1, 2, 5):
+            self.client.post(
+                "/api/order/",
+                {"products": [{"product_id": product.id, "quantity": quantity}]},
+                format="json",
+            )
+        self.orders = list(Order.objects.order_by("pk"))
+        for month, order in enumerate(self.orders, start=1):
+            Order.objects.filter(pk=order.pk).update(
+                created_at=timezone.make_aware(datetime(2024, month, 1, 12))
+            )
+        project_orders([order.pk for order in self.orders])
+        response = self.client.post(
+            "/api/payment/",
+            {
+                "order_id": self.orders[1].pk,
+                "payment_method": "UPI",
+                "amount_paid": self.orders[1].total_price,
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def search(self, **params):
+        response = self.client.get("/api/order/", params)
+        self.assertEqual(response.status_code, 200, response.content)
+        positions = {order.pk: index for index, order in enumerate(self.orders)}
+        return [positions[row["order_id"]] for row in response.json()]
+
+    def test_date_filters(self):
+        self.assertEqual(self.search(created_after="2024-01-15"), [1, 2])
+        self.assertEqual(self.search(created_before="2024-02-01T12:00:00Z"), [0])
+        self.assertEqual(
+            self.search(created_after="2024-01-01", created_before="2024-03-01"),
+            [0, 1],
+        )
+
+    def test_total_filters(self):
+        self.assertEqual(self.search(minimum_total_price="20"), [1, 2])
+        self.assertEqual(self.search(maximum_total_price="20.00"), [0, 1])
+        self.assertEqual(
+            self.search(minimum_total_price="15", maximum_total_price="30"), [1]
+        )
+
+    def test_malformed_totals_are_rejected(self):
+        for value in ("abc", "NaN", "sNaN", "Infinity", "-inf"):
+            for name in ("minimum_total_price", "maximum_total_price"):
+                with self.subTest(name=name, value=value):
+                    response = self.client.get("/api/order/", {name: value})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(name, response.json())
+
+    def test_payment_status_filter(self):
+        self.assertEqual(self.search(payment_status="Completed"), [1])
+        self.assertEqual(self.search(payment_status="Failed"), [])
+        self.assertEqual(
+            self.search(payment_status="Completed", created_after="2024-03-01"), []
+        )
+
+    def test_user_id_is_staff_only(self):
+        other = User.objects.create_user(
+            username="other", email="other@example.com", password="Password123!"
+        )
+        self.client.force_authenticate(other)
+        response = self.client.get("/api/order/", {"user_id": self.user.pk})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get("/api/order/").json(), [])
+
+        other.is_staff = True
+        other.save()
+        response = self.client.get(
+            "/api/order/", {"user_id": self.user.pk, "minimum_total_price": "20"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [row["order_id"] for row in response.json()],
+            [order.pk for order in self.orders[1:]],
+        )
+
+
+class PricingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", price="10.00", category="gloves"
+        )
+
+    def quote(self):
+        product = Product.objects.get(pk=self.product.pk)
+        return quote_order([(product, 2)])
+
+    def test_quote_follows_changes_that_skip_signals(self):
+        self.assertEqual(self.quote()["total_price"], Decimal("20.00"))
+        Product.objects.filter(pk=self.product.pk).update(price="15.00")
+        quote = self.quote()
+        self.assertEqual(quote["total_price"], Decimal("30.00"))
+        self.assertEqual(quote["lines"][0]["unit_price"], Decimal("15.00"))
+        with self.captureOnCommitCallbacks(execute=True):
+            PricingRule.objects.create(
+                name="Gloves",
+                kind=PricingRule.CATEGORY,
+                category="gloves",
+                percent_off=10,
+            )
+        self.assertEqual(self.quote()["total_price"], Decimal("27.00"))
+
+    @override_settings(PRICING_RULES_MAX_AGE=0)
+    def test_compiled_rules_expire(self):
+        rule = PricingRule.objects.create(
+            name="Gloves", kind=PricingRule.CATEGORY, category="gloves", percent_off=10
+        )
+        self.assertIn("gloves", get_compiled_rules().by_category)
+        PricingRule.objects.filter(pk=rule.pk).update(is_active=False)
+        self.assertNotIn("gloves", get_compiled_rules().by_category)
+
+
+class OrderSnapshotTestCase(TestCase):
+    def setUp(self):
+        # Rolled back users hand out the same ids again.
+        caches["versions"].clear()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", description="Red", price="10.00"
+        )
+
+    def test_orders_keep_their_price_after_catalog_changes(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(
+            "/api/order/",
+            {"products": [{"product_id": self.product.id, "quantity": 2}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        order_id = response.data["order_id"]
+
+        self.product.product_name = "Sparring Glove"
+        self.product.price = "25.00"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+
+        response = client.get("/api/order/", {"order_id": order_id})
+        self.assertEqual(response.status_code, 200, response.content)
+        order_data = response.json()[0]
+        self.assertEqual(Decimal(str(order_data["total_price"])), 20)
+        self.assertEqual(
+            order_data["product_details"][0]["product_name"], "Boxing Glove"
+        )
+        self.assertEqual(Decimal(order_data["product_details"][0]["price"]), 10)
+
+    def test_migration_backfills_missing_snapshots(self):
+        migration = importlib.import_module(
+            "shopping_cart.migrations.0013_order_item_snapshot"
+        )
+        order = Order.objects.create(user=self.user, total_price="10.00")
+        item = OrderItem.objects.create(order=order, product=self.product, quantity=1)
+        snapshotted = OrderItem.objects.create(
+            order=order,
+            product=self.product,
+            quantity=1,
+            product_name="Old Glove",
+            unit_price="8.00",
+        )
+        OrderItem.objects.filter(pk=item.pk).update(
+            product_name=None, product_description=None, unit_price=None
+        )
+
+        with mock.patch.object(migration, "BATCH_SIZE", 1):
+            migration.backfill_snapshots(
+                django_apps, connection.schema_editor(atomic=False)
+            )
+
+        item.refresh_from_db()
+        self.assertEqual(item.product_name, "Boxing Glove")
+        self.assertEqual(item.product_description, "Red")
+        self.assertEqual(item.unit_price, Decimal("10.00"))
+        snapshotted.refresh_from_db()
+        self.assertEqual(snapshotted.product_name, "Old Glove")
+        self.assertEqual(snapshotted.unit_price, Decimal("8.00"))
+
+
+class ProjectionTestCase(TestCase):
+    def setUp(self):
+        # Rolled back users hand out the same ids again.
+        caches["versions"].clear()
+
+    def test_catch_up_retires_cached_order_history(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post(
+            "/api/order/",
+            {"products": [{"product_id": product.id, "quantity": 1}]},
+            format="json",
+        )
+        response = client.get("/api/order/")
+        self.assertEqual(Decimal(str(response.data[0]["total_price"])), 10)
+
+        # An edit made outside the API, as from the admin.
+        Order.objects.update(total_price="1.00", updated_at=timezone.now())
+        with self.captureOnCommitCallbacks(execute=True):
+            catch_up_projections()
+        response = client.get("/api/order/")
+        self.assertEqual(Decimal(str(response.data[0]["total_price"])), 1)
+
+    def test_sparse_reads_extract_fields_in_sql(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        client = APIClient()
+        client.force_authenticate(user)
+        client.post(
+            "/api/order/",
+            {"products": [{"product_id": product.id, "quantity": 2}]},
+            format="json",
+        )
+        order = Order.objects.get()
+        client.post(
+            "/api/payment/",
+            {"order_id": order.id, "payment_method": "UPI", "amount_paid": "20.00"},
+            format="json",
+        )
+        cases = (
+            (
+                "/api/order/",
+                {"order_id": order.id, "fields": "order_id,total_price"},
+                [{"order_id": order.id, "total_price": 20.0}],
+            ),
+            (
+                "/api/order/",
+                {"minimum_total_price": "1", "fields": "total_price"},
+                [{"total_price": 20.0}],
+            ),
+            (
+                "/api/payment/",
+                {"order_id": order.id, "fields": "amount_paid"},
+                {"amount_paid": "20.00"},
+            ),
+            ("/api/payment/", {"fields": "amount_paid"}, [{"amount_paid": "20.00"}]),
+        )
+        for path, params, expected in cases:
+            with self.subTest(path=path, params=params):
+                with CaptureQueriesContext(connection) as context:
+                    response = client.get(path, params)
+                self.assertEqual(response.json(), expected)
+                # Only the requested keys are read, never the whole JSON column.
+                sql = context.captured_queries[-1]["sql"]
+                self.assertIsNone(
+                    re.search(
+                        r'(SELECT |, )"shopping_cart_orderprojection"\."(document|payment)"(,| FROM)',
+                        sql,
+                    )
+                )
+        response = client.get("/api/payment/", {"order_id": order.id})
+        etag = response.headers["ETag"]
+        response = client.get(
+            "/api/payment/", {"order_id": order.id, "fields": "amount_paid"}
+        )
+        self.assertEqual(response.headers["ETag"], etag)
+
+
+class CacheVersionTestCase(TestCase):
+    def test_lru_cache_evicts_least_recently_used(self):
+        lru = LRUCache(2)
+        lru.set("a", 1, "A")
+        lru.set("b", 1, "B")
+        self.assertEqual(lru.get("a", 1), "A")
+        lru.set("c", 1, "C")
+        self.assertIsNone(lru.get("b", 1))
+        self.assertIsNone(lru.get("a", 2))
+        self.assertIsNone(lru.get("a", 1))
+        self.assertEqual(
+            lru.stats(),
+            {
+                "entries": 1,
+                "max_entries": 2,
+                "hits": 1,
+                "misses": 3,
+                "evictions": 1,
+                "hit_ratio": 0.25,
+            },
+        )
+
+    def test_orders_from_other_requests_retire_cached_history(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        order = {"products": [{"product_id": product.id, "quantity": 1}]}
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            client.post("/api/order/", order, format="json")
+        self.assertEqual(len(client.get("/api/order/").data), 1)
+        hits = order_history_cache.stats()["hits"]
+        self.assertEqual(len(client.get("/api/order/").data), 1)
+        self.assertEqual(order_history_cache.stats()["hits"], hits + 1)
+        with self.assertNumQueries(0):
+            order_history_version(user.pk)
+
+        other_client = APIClient()
+        other_client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            other_client.post("/api/order/", order, format="json")
+        self.assertEqual(len(client.get("/api/order/").data), 2)
+
+    def test_catalog_version_changes_on_commit(self):
+        version = get_version(CATALOG_VERSION)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Product.objects.create(product_name="Boxing Glove", price="10.00")
+        self.assertEqual(get_version(CATALOG_VERSION), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(CATALOG_VERSION), version)
+
+
+class InventoryConcurrencyTestCase(TransactionTestCase):
+    """
+    Hammer one hot product from many threads and check it never oversells.
+    """
+
+    stock = 25
+    workers = 100
+
+    def test_concurrent_reservations_never_oversell(self):
+        user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        product = Product.objects.create(
+            product_name="Flash Sale", price="1.00", stock=self.stock
+        )
+        start = threading.Barrier(self.workers)
+        outcomes = []
+
+        def checkout():
+            start.wait()
+            try:
+                with transaction.atomic():
+                    order = Order.objects.create(user=user)
+                    reserve_stock(order, [(product, 1)])
+                outcomes.append("reserved")
+            except OutOfStock:
+                outcomes.append("sold out")
+            except OperationalError:
+                # SQLite refuses concurrent writers outright instead of
+                # queueing them; that is a fast failure, not an oversell.
+                outcomes.append("busy")
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reserved = outcomes.count("reserved")
+        product.refresh_from_db()
+        self.assertEqual(len(outcomes), self.workers)
+        self.assertLessEqual(reserved, self.stock)
+        self.assertEqual(product.stock, self.stock - reserved)
+        self.assertEqual(StockReservation.objects.count(), reserved)
+
+
+class BatchRequestTestCase(TransactionTestCase):
+    """
+    Batches run outside a transaction here, so consecutive reads go through
+    the thread pool as they do in production.
+    """
+
+    def setUp(self):
+        cache.clear()
+        # Flushed tables hand out the same user ids again.
+        caches["versions"].clear()
+        self.user = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+        self.product = Product.objects.create(
+            product_name="Boxing Glove", price="10.00"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def batch(self, *entries):
+        return self.client.post(
+            "/api/batch/", {"requests": list(entries)}, format="json"
+        )
+
+    def test_reads_see_earlier_writes(self):
+        order = {"products": [{"product_id": self.product.id, "quantity": 2}]}
+        response = self.batch(
+            {"id": "before", "path": "/api/order/"},
+            {"id": "create", "method": "POST", "path": "/api/order/", "body": order},
+            {"id": "after", "path": "/api/order/"},
+            {"id": "product", "path": "/api/product/?ids=" + str(self.product.id)},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["responses"]
+        self.assertEqual(
+            [result["id"] for result in results],
+            ["before", "create", "after", "product"],
+        )
+        self.assertEqual([result["status"] for result in results], [200, 201, 200, 200])
+        self.assertEqual(results[0]["body"], [])
+        self.assertEqual(
+            [(row["user_id"], row["total_price"]) for row in results[2]["body"]],
+            [(self.user.pk, 20.0)],
+        )
+        self.assertEqual(results[3]["body"]["products"][0]["id"], self.product.id)
+
+    def test_failed_sub_requests_do_not_fail_the_batch(self):
+        response = self.batch(
+            {"path": "/api/token/", "method": "POST"},
+            {"path": "/api/batch/", "method": "POST"},
+            {"path": "/api/missing/"},
+            {"path": "/api/user/"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result["status"] for result in response.json()["responses"]],
+            [400, 400, 404, 200],
+        )
+
+    def test_malformed_batches_are_rejected(self):
+        for entries in (
+            [],
+            [{"method": "TRACE", "path": "/api/user/"}],
+            [{"path": "https://example.com/api/user/"}],
+            [{"path": "/admin/"}],
+            [{"path": "/api/user/", "params": ["a"]}],
+        ):
+            with self.subTest(entries=entries):
+                self.assertEqual(self.batch(*entries).status_code, 400)
+        with self.settings(BATCH_REQUEST_LIMIT=1):
+            response = self.batch({"path": "/api/user/"}, {"path": "/api/user/"})
+        self.assertEqual(response.status_code, 400)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.batch({"path": "/api/user/"}).status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ProvisioningTestCase(TestCase):
+    def row(self, username, email=None):
+        return {
+            "username": username,
+            "email": email or f"{username}@example.com",
+            "password": "Sturdy-Pass-42",
+            "first_name": "Test",
+            "last_name": "User",
+            "phone_number": "9876543210",
+        }
+
+    def test_provision_users(self):
+        User.objects.create_user(
+            username="taken", email="taken@example.com", password="Password123!"
+        )
+        rows = [self.row(f"user{i}") for i in range(5)] + [
+            self.row("taken", "fresh@example.com"),
+            self.row("user0", "other@example.com"),
+            self.row("nomail", "not-an-email"),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            results = provision_users(rows, batch_size=4, workers=1)
+        lookups = [
+            query
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT")
+        ]
+        self.assertEqual(len(lookups), 2)
+        self.assertEqual(
+            [result["status"] for result in results],
+            [201, 201, 201, 201, 201, 409, 409, 400],
+        )
+        self.assertIn("username", results[6]["errors"])
+        user = User.objects.get(pk=results[0]["id"])
+        self.assertTrue(user.check_password("Sturdy-Pass-42"))
+        self.assertEqual(User.objects.count(), 6)
+
+    def test_concurrent_registration_fails_only_its_row(self):
+        def register_late_then_hash(password):
+            # Another request registers "late" after the duplicate check.
+            if not User.objects.filter(username="late").exists():
+                User.objects.create(username="late", email="late@example.com")
+            return "!"
+
+        rows = [self.row("early"), self.row("late"), self.row("after")]
+        with mock.patch(
+            "shopping_cart.provisioning.make_password", register_late_then_hash
+        ):
+            results = provision_users(rows, workers=1)
+        self.assertEqual([result["status"] for result in results], [201, 409, 201])
+        self.assertEqual(
+            set(User.objects.values_list("username", flat=True)),
+            {"early", "late", "after"},
+        )
+
+
+# Cheap parameters; only the rehashing matters here.
+@override_settings(
+    PASSWORD_HASHER_PROFILES={
+        "scrypt": {
+            "hasher": "shopping_cart.hashers.ScryptPasswordHasher",
+            "work_factor": 2**4,
+            "block_size": 8,
+            "parallelism": 1,
+        },
+        "pbkdf2": {
+            "hasher": "shopping_cart.hashers.PBKDF2PasswordHasher",
+            "iterations": 1000,
+        },
+    }
+)
+class PasswordHashingTestCase(TestCase):
+    def login(self):
+        return APIClient().post(
+            "/api/token/",
+            {"username": "buyer", "password": "Password123!"},
+            format="json",
+        )
+
+    def test_login_rehashes_with_current_profile(self):
+        with self.settings(
+            PASSWORD_HASHERS=["shopping_cart.hashers.PBKDF2PasswordHasher"]
+        ):
+            user = User.objects.create_user(
+                username="buyer", email="buyer@example.com", password="Password123!"
+            )
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$1000$"))
+        with self.settings(
+            PASSWORD_HASHERS=[
+                "shopping_cart.hashers.ScryptPasswordHasher",
+                "shopping_cart.hashers.PBKDF2PasswordHasher",
+            ]
+        ):
+            self.assertEqual(self.login().status_code, 200)
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith("scrypt$"))
+            self.assertEqual(self.login().status_code, 200)
+            with self.settings(PASSWORD_HASH_MAX_PENDING=0):
+                response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
+
+
+@override_settings(
+    TRACING_ENABLED=True, TRACE_SAMPLE_RATE=0.0, TRACE_SLOW_REQUEST_MS=60000
+)
+class TracingTestCase(TestCase):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    parent_id = "00f067aa0ba902b7"
+
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(product_name="Boxing Glove", price="10.00")
+        exporter = mock.patch("shopping_cart.tracing.exporter")
+        self.exporter = exporter.start()
+        self.addCleanup(exporter.stop)
+
+    def get(self, **headers):
+        return APIClient().get("/api/product/", **headers)
+
+    def exported(self):
+        return [call.args[0] for call in self.exporter.export.call_args_list]
+
+    def test_parse_traceparent(self):
+        header = f"00-{self.trace_id.upper()}-{self.parent_id}-01"
+        self.assertEqual(
+            parse_traceparent(header), (self.trace_id, self.parent_id, True)
+        )
+        self.assertEqual(
+            parse_traceparent(f"00-{self.trace_id}-{self.parent_id}-00"),
+            (self.trace_id, self.parent_id, False),
+        )
+        for header in (
+            None,
+            "",
+            f"01-{self.trace_id}-{self.parent_id}-01",
+            f"00-{'0' * 32}-{self.parent_id}-01",
+            f"00-{self.trace_id}-{'0' * 16}-01",
+            f"00-{self.trace_id[:-1]}z-{self.parent_id}-01",
+            f"00-{self.trace_id}-{self.parent_id}-1",
+            f"00-{self.trace_id}-{self.parent_id}",
+        ):
+            with self.subTest(header=header):
+                self.assertIsNone(parse_traceparent(header))
+
+    def test_sampling(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.get(HTTP_TRACEPARENT=f"00-{self.trace_id}-{self.parent_id}-00")
+        self.assertEqual(self.exported(), [])
+
+        self.get(HTTP_TRACEPARENT=f"00-{self.trace_id}-{self.parent_id}-01")
+        [trace] = self.exported()
+        self.assertEqual(trace.trace_id, self.trace_id)
+        root = trace.spans[-1]
+        self.assertEqual(root.parent_id, self.parent_id)
+        self.assertEqual(root.name, "GET api/product/")
+        self.assertEqual(root.attributes["http.status_code"], 200)
+        children = {span.name for span in trace.spans if span.parent_id == root.span_id}
+        self.assertIn("db.query", children)
+        self.assertIn("render.json", children)
+
+        with self.settings(TRACE_SAMPLE_RATE=1.0):
+            self.get()
+        with self.settings(TRACE_SLOW_REQUEST_MS=0):
+            self.get()
+        self.assertEqual(len(self.exported()), 3)
+
+    def test_otlp_encoding(self):
+        trace = Trace(self.trace_id, self.parent_id, sampled=True)
+        with trace.span("GET api/product/", SPAN_KIND_SERVER, retries=2) as root:
+            with self.assertRaises(ValueError), trace.span(
+                "render.json", cached=False, ratio=0.5
+            ):
+                raise ValueError("bad")
+        with tempfile.TemporaryDirectory() as trace_dir, self.settings(
+            TRACE_EXPORT_PATH=Path(trace_dir) / "traces.jsonl"
+        ):
+            exporter = TraceExporter()
+            exporter.export(trace)
+            exporter.shutdown()
+            [line] = (Path(trace_dir) / "traces.jsonl").read_text().splitlines()
+        [resource] = json.loads(line)["resourceSpans"]
+        self.assertEqual(
+            resource["resource"]["attributes"],
+            [{"key": "service.name", "value": {"stringValue": "shop_ease"}}],
+        )
+        child, parent = resource["scopeSpans"][0]["spans"]
+        self.assertEqual(parent["traceId"], self.trace_id)
+        self.assertEqual(parent["parentSpanId"], self.parent_id)
+        self.assertEqual(child["parentSpanId"], root.span_id)
+        self.assertEqual(parent["kind"], SPAN_KIND_SERVER)
+        self.assertEqual(parent["status"], {"code": STATUS_OK})
+        self.assertEqual(
+            child["status"], {"code": STATUS_ERROR, "message": "ValueError: bad"}
+        )
+        self.assertEqual(
+            parent["attributes"], [{"key": "retries", "value": {"intValue": "2"}}]
+        )
+        self.assertEqual(
+            child["attributes"],
+            [
+                {"key": "cached", "value": {"boolValue": False}},
+                {"key": "ratio", "value": {"doubleValue": 0.5}},
+            ],
+        )
+        self.assertLessEqual(
+            int(parent["startTimeUnixNano"]), int(child["startTimeUnixNano"])
+        )
+        self.assertGreaterEqual(
+            int(parent["endTimeUnixNano"]), int(child["endTimeUnixNano"])
+        )
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILE_RETENTION_PER_VIEW=2)
+class ProfilingTestCase(TestCase):
+    def setUp(self):
+        profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(profile_dir.cleanup)
+        profile_settings = override_settings(PROFILE_DIR=Path(profile_dir.name))
+        profile_settings.enable()
+        self.addCleanup(profile_settings.disable)
+        Product.objects.create(product_name="Boxing Glove", price="10.00")
+        self.staff = User.objects.create_user(
+            username="admin",
+            email="admin@example.com",
+            password="Password123!",
+            is_staff=True,
+        )
+        self.customer = User.objects.create_user(
+            username="buyer", email="buyer@example.com", password="Password123!"
+        )
+
+    def client_for(self, user):
+        # The middleware checks the token itself, before DRF authenticates.
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        return client
+
+    def test_staff_profiles_a_request(self):
+        client = self.client_for(self.staff)
+        response = client.get("/api/product/", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 200)
+        profile_id = response["X-Profile-Id"]
+        self.assertTrue(profile_id.startswith("ManageProductAPIView.get/"))
+
+        response = client.get("/api/profiles/", {"view": "ManageProductAPIView.get"})
+        self.assertEqual([profile["id"] for profile in response.json()], [profile_id])
+        response = client.get("/api/profiles/", {"id": profile_id, "output": "text"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"function calls", response.content)
+        response = client.get("/api/profiles/", {"id": "../../etc/passwd"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_only_staff_can_profile(self):
+        client = self.client_for(self.customer)
+        response = client.get("/api/product/", HTTP_X_PROFILE="1")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertEqual(client.get("/api/profiles/").status_code, 403)
+
+    def test_newest_profiles_are_kept(self):
+        client = self.client_for(self.staff)
+        profile_ids = [
+            client.get("/api/product/", HTTP_X_PROFILE="1")["X-Profile-Id"]
+            for _ in range(3)
+        ]
+        response = client.get("/api/profiles/")
+        self.assertEqual(
+            [profile["id"] for profile in response.json()], profile_ids[:0:-1]
+        )
+
+
+# Password hashing cost is irrelevant to query counts.
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class WarmupTestCase(TestCase):
+    def test_warm_up_fills_caches_and_keeps_connections(self):
+        caches["products"].clear()
+        product = Product.objects.create(product_name="Boxing Glove", price="10.00")
+        with mock.patch.object(
+            product_name_index, "_built_at", None
+        ), mock.patch.object(connections, "close_all") as close_all:
+            timings = warm_up()
+            self.assertIsNotNone(product_name_index._built_at)
+        self.assertIsNotNone(timings["product_cache"])
+        self.assertIn(product.pk, get_cached_products([product.pk]))
+        self.assertIsNotNone(connection.connection)
+        close_all.assert_not_called()
+
+        with mock.patch.object(connections, "close_all") as close_all:
+            timings = warm_up(close_connections=True)
+        close_all.assert_called_once_with()
+        self.assertIn("close_connections", timings)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Every endpoint must issue the same number of queries whether it deals
+    with 1, 10 or 100 order lines (or orders, products, ...), and none of
+    those queries may scan a whole table of orders, payments or users.
+
+    Each size gets its own user, catalog and order history, so caches
+    warmed for one size do not hide the queries of the next.
+    """
+
+    sizes = (1, 10, 100)
+    # Tables whose rows grow with traffic; reading them must use an index.
+    hot_tables = {
+        "shopping_cart_archivedorder",
+        "shopping_cart_order",
+        "shopping_cart_orderitem",
+        "shopping_cart_orderprojection",
+        "shopping_cart_payment",
+        "shopping_cart_stockreservation",
+        "shopping_cart_user",
+    }
+    password = "Password123!"
+
+    def setUp(self):
+        cache.clear()
+        caches["products"].clear()
+        self.client = APIClient()
+
+    def make_customer(self, size):
+        """
+        A user with ``size`` products in the catalog and ``size`` orders of
+        ``size`` lines each.
+        """
+        user = User.objects.create_user(
+            username=f"buyer{size}",
+            email=f"buyer{size}@example.com",
+            password=self.password,
+        )
+        products = Product.objects.bulk_create(
+            Product(product_name=f"Glove {size} {n}", price="10.00")
+            for n in range(size)
+        )
+        lines = [{"product_id": product.id, "quantity": 2} for product in products]
+        results = create_orders_in_bulk([{"products": lines}] * size, user)
+        orders = list(Order.objects.filter(pk__in=[r["order_id"] for r in results]))
+        self.client.force_authenticate(user)
+        return user, products, lines, orders
+
+    def count_queries(self, method, path, data=None, status=200, **extra):
+        if method != "get":
+            extra["format"] = "json"
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, data, **extra)
+        self.assertEqual(response.status_code, status, response.content)
+        self.assertNoFullScans(context.captured_queries)
+        return len(context)
+
+    def assertNoFullScans(self, queries):
+        if connection.vendor != "sqlite":
+            return
+        for query in queries:
+            if not query["sql"].startswith("SELECT"):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute("EXPLAIN QUERY PLAN " + query["sql"])
+                plan = [row[-1] for row in cursor.fetchall()]
+            # "SCAN [TABLE] name" without "USING ... INDEX" reads every row.
+            scans = [
+                step
+                for step in plan
+                if step.startswith("SCAN ")
+                and " USING " not in step
+                and step.replace("SCAN TABLE ", "SCAN ").split()[1] in self.hot_tables
+            ]
+            self.assertFalse(scans, f"Full table scan in {query['sql']}: {plan}")
+
+    def assertFlat(self, scenario):
+        """
+        Run ``scenario(size)`` for every size; it returns the query count
+        (or a tuple of counts) of the requests it makes.
+        """
+        counts = {}
+        for size in self.sizes:
+            with self.subTest(size=size):
+                counts[size] = scenario(size)
+        if len(counts) == len(self.sizes):
+            self.assertEqual(len(set(counts.values())), 1, f"Query counts: {counts}")
+
+    def test_every_endpoint_is_covered(self):
+        tested = {
+            name[len("test_") :]
+            for name in dir(self)
+            if name.startswith("test_") and name != "test_every_endpoint_is_covered"
+        }
+        for pattern in urlpatterns:
+            with self.subTest(pattern.name):
+                self.assertTrue(
+                    any(test.startswith(pattern.name) for test in tested),
+                    f"No query budget test for {pattern.name}",
+                )
+
+    def test_token_obtain_pair(self):
+        def scenario(size):
+            user, *_ = self.make_customer(size)
+            return self.count_queries(
+                "post",
+                "/api/token/",
+                {"username": user.username, "password": self.password},
+            )
+
+        self.assertFlat(scenario)
+
+    def test_token_refresh(self):
+        def scenario(size):
+            user, *_ = self.make_customer(size)
+            tokens = self.client.post(
+                "/api/token/",
+                {"username": user.username, "password": self.password},
+                format="json",
+            ).json()
+            return self.count_queries(
+                "post", "/api/token/refresh/", {"refresh": tokens["refresh"]}
+            )
+
+        self.assertFlat(scenario)
+
+    def test_register_user(self):
+        def scenario(size):
+            self.make_customer(size)
+            return self.count_queries(
+                "post",
+                "/user/",
+                {
+                    "username": f"new{size}",
+                    "first_name": "Ann",
+                    "last_name": "Lee",
+                    "email": f"new{size}@example.com",
+                    "password": self.password,
+                    "phone_number": "5550100",
+                },
+                status=201,
+            )
+
+        self.assertFlat(scenario)
+
+    def test_fetch_user(self):
+        def scenario(size):
+            user, *_ = self.make_customer(size)
+            profile = {
+                "username": user.username,
+                "first_name": "Ann",
+                "last_name": "Lee",
+                "email": user.email,
+                "password": self.password,
+                "phone_number": "5550100",
+            }
+            get = self.count_queries("get", "/api/user/")
+            put = self.count_queries("put", "/api/user/", profile)
+            patch = self.count_queries("patch", "/api/user/", {"last_name": "Lee"})
+            return get, put, patch
+
+        self.assertFlat(scenario)
+
+    def test_manage_product(self):
+        def scenario(size):
+            _, products, *_ = self.make_customer(size)
+            ids = ",".join(str(product.id) for product in products)
+            product = products[0]
+            return (
+                self.count_queries("get", "/api/product/", {"product_name": "Glove"}),
+                self.count_queries("get", "/api/product/", {"ids": ids}),
+                self.count_queries(
+                    "post",
+                    "/api/product/",
+                    {"product_name": "Wrap", "price": "5.00"},
+                    status=201,
+                ),
+                self.count_queries(
+                    "put",
+                    "/api/product/",
+                    {"id": product.id, "product_name": "Glove", "price": "11.00"},
+                ),
+                self.count_queries(
+                    "patch", "/api/product/", {"id": product.id, "price": "12.00"}
+                ),
+            )
+
+        self.assertFlat(scenario)
+
+    def test_product_autocomplete(self):
+        def scenario(size):
+            self.make_customer(size)
+            # The prefix index is built once per process; only count lookups.
+            product_name_index.warm()
+            return self.count_queries("get", "/api/product/autocomplete/", {"q": "gl"})
+
+        self.assertFlat(scenario)
+
+    def test_product_facets(self):
+        def scenario(size):
+            self.make_customer(size)
+            return self.count_queries(
+                "get", "/api/product/facets/", {"product_name": f"Glove {size}"}
+            )
+
+        self.assertFlat(scenario)
+
+    def test_product_recommendations(self):
+        def scenario(size):
+            user, products, lines, _ = self.make_customer(size)
+            wrap = Product.objects.create(product_name=f"Wrap {size}", price="5.00")
+            create_orders_in_bulk(
+                [{"products": [lines[0], {"product_id": wrap.id, "quantity": 1}]}],
+                user,
+            )
+            refresh_recommendations()
+            return self.count_queries(
+                "get",
+                "/api/product/recommendations/",
+                {"product_id": products[0].id, "limit": 20},
+            )
+
+        with tempfile.TemporaryDirectory() as index_dir, override_settings(
+            RECOMMENDATION_INDEX_PATH=Path(index_dir) / "related_products.npz"
+        ):
+            self.assertFlat(scenario)
+
+    def test_manage_order(self):
+        def scenario(size):
+            _, _, lines, orders = self.make_customer(size)
+            order = orders[0]
+            extra = Product.objects.create(product_name="Wrap", price="1.00")
+            return (
+                self.count_queries("post", "/api/order/", {"products": lines}, 201),
+                self.count_queries("get", "/api/order/"),
+                self.count_queries("get", "/api/order/", {"order_id": order.id}),
+                self.count_queries(
+                    "get",
+                    "/api/order/",
+                    {"order_id": order.id, "fields": "order_id,total_price"},
+                ),
+                self.count_queries("get", "/api/order/", {"include_archived": "true"}),
+                self.count_queries(
+                    "get",
+                    "/api/order/",
+                    {
+                        "created_after": "2000-01-01",
+                        "created_before": timezone.now().isoformat(),
+                        "payment_status": "Failed",
+                        "include_archived": "true",
+                    },
+                ),
+                self.count_queries(
+                    "get",
+                    "/api/order/",
+                    {"minimum_total_price": "1", "maximum_total_price": "100000"},
+                ),
+                self.count_queries(
+                    "put",
+                    "/api/order/",
+                    {
+                        "order_id": order.id,
+                        "products": [dict(line, quantity=3) for line in lines]
+                        + [{"product_id": extra.id, "quantity": 1}],
+                    },
+                ),
+                self.count_queries(
+                    "put", "/api/order/", {"order_id": order.id, "products": lines}
+                ),
+            )
+
+        self.assertFlat(scenario)
+
+    def test_batch_order(self):
+        def scenario(size):
+            _, _, lines, _ = self.make_customer(size)
+            return self.count_queries(
+                "post",
+                "/api/order/batch/",
+                {"orders": [{"products": lines[:1]} for _ in range(size)]},
+                status=201,
+            )
+
+        self.assertFlat(scenario)
+
+    def test_checkout_order(self):
+        def scenario(size):
+            _, _, lines, _ = self.make_customer(size)
+            return self.count_queries(
+                "post",
+                "/api/order/checkout/",
+                {
+                    "products": lines,
+                    "payment_method": "UPI",
+                    "amount_paid": str(20 * size),
+                },
+                status=201,
+            )
+
+        self.assertFlat(scenario)
+
+    def test_order_history_cache_stats(self):
+        def scenario(size):
+            user, *_ = self.make_customer(size)
+            user.is_staff = True
+            user.save()
+            return self.count_queries("get", "/api/order/cache-stats/")
+
+        self.assertFlat(scenario)
+
+    def test_profiles(self):
+        def scenario(size):
+            user, *_ = self.make_customer(size)
+            user.is_staff = True
+            user.save()
+            return self.count_queries("get", "/api/profiles/")
+
+        self.assertFlat(scenario)
+
+    def test_manage_cart(self):
+        def scenario(size):
+            _, products, _, _ = self.make_customer(size)
+            for product in products:
+                self.client.post(
+                    "/api/cart/", {"product_id": product.id, "quantity": 1}
+                )
+            product_id = products[0].id
+            return (
+                self.count_queries("get", "/api/cart/"),
+                self.count_queries(
+                    "post", "/api/cart/", {"product_id": product_id, "quantity": 1}
+                ),
+                self.count_queries(
+                    "put", "/api/cart/", {"product_id": product_id, "quantity": 3}
+                ),
+                self.count_queries("delete", "/api/cart/", {"product_id": product_id}),
+            )
+
+        self.assertFlat(scenario)
+
+    def test_checkout_cart(self):
+        def scenario(size):
+            _, products, _, _ = self.make_customer(size)
+            for product in products:
+                self.client.post(
+                    "/api/cart/", {"product_id": product.id, "quantity": 1}
+                )
+            return self.count_queries("post", "/api/cart/checkout/", status=201)
+
+        self.assertFlat(scenario)
+
+    def test_manage_payment(self):
+        def scenario(size):
+            _, _, _, orders = self.make_customer(size)
+            order, paid_orders = orders[0], orders[1:]
+            Payment.objects.bulk_create(
+                Payment(
+                    order=paid_order,
+                    payment_method="UPI",
+                    amount_paid=paid_order.total_price,
+                    payment_status="Completed",
+                )
+                for paid_order in paid_orders
+            )
+            payment = {"order_id": order.id, "payment_method": "UPI"}
+            return (
+                self.count_queries(
+                    "post", "/api/payment/", dict(payment, amount_paid=1), 400
+                ),
+                self.count_queries(
+                    "put",
+                    "/api/payment/",
+                    dict(payment, amount_paid=order.total_price),
+                ),
+                self.count_queries("get", "/api/payment/"),
+                self.count_queries("get", "/api/payment/", {"order_id": order.id}),
+            )
+
+        self.assertFlat(scenario)
+
+    def test_batch_request(self):
+        def scenario(size):
+            _, products, _, _ = self.make_customer(size)
+            home_screen = [
+                {"method": "GET", "path": "/api/user/"},
+                {"method": "GET", "path": "/api/order/"},
+                {"method": "GET", "path": "/api/payment/"},
+                {
+                    "method": "GET",
+                    "path": "/api/product/",
+                    "params": {"ids": ",".join(str(p.id) for p in products)},
+                },
+            ]
+            separate = sum(
+                self.count_queries("get", entry["path"], entry.get("params"))
+                for entry in home_screen
+            )
+            cache.clear()
+            caches["products"].clear()
+            batched = self.count_queries(
+                "post", "/api/batch/", {"requests": home_screen}
+            )
+            self.assertLessEqual(batched, separate)
+            return batched
+
+        self.assertFlat(scenario)
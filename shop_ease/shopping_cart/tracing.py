@@ -0,0 +1,348 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_trace = ContextVar("shopping_cart_trace", default=None)
+
+
+class Span:
+    __slots__ = (
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, name, parent_id, kind, attributes):
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    def to_otlp(self, trace_id):
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                _otlp_attribute(key, value) for key, value in self.attributes.items()
+            ],
+            "status": (
+                {"code": STATUS_ERROR, "message": self.error}
+                if self.error
+                else {"code": STATUS_OK}
+            ),
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Trace:
+    """
+    Spans recorded for one request.
+
+    Spans are always recorded while the request runs; whether the trace is
+    exported is decided at the end, so slow requests can be kept even when
+    they were not head-sampled.
+    """
+
+    def __init__(self, trace_id=None, parent_id=None, sampled=False):
+        self.trace_id = trace_id or secrets.token_hex(16)
+        self.sampled = sampled
+        self.spans = []
+        self._stack = [parent_id]
+
+    @contextmanager
+    def span(self, name, kind=SPAN_KIND_INTERNAL, **attributes):
+        span = Span(name, self._stack[-1], kind, attributes)
+        self._stack.append(span.span_id)
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self._stack.pop()
+            self.spans.append(span)
+
+    def to_otlp(self):
+        """
+        The trace as an OTLP/JSON ``ExportTraceServiceRequest``.
+        """
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            _otlp_attribute("service.name", settings.TRACE_SERVICE_NAME)
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "shopping_cart"},
+                            "spans": [
+                                span.to_otlp(self.trace_id) for span in self.spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+@contextmanager
+def span(name, kind=SPAN_KIND_INTERNAL, **attributes):
+    """
+    Record a span in the trace of the current request, if it is traced.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, kind, **attributes) as current:
+        yield current
+
+
+def parse_traceparent(header):
+    """
+    Parse a W3C ``traceparent`` header.
+
+    Returns:
+    - tuple: ``(trace_id, parent_span_id, sampled)``, or None if invalid.
+    """
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or parts[0] != "00":
+        return None
+    _, trace_id, parent_id, flags = parts
+    if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        if not int(trace_id, 16) or not int(parent_id, 16):
+            return None
+        sampled = bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+    return trace_id.lower(), parent_id.lower(), sampled
+
+
+class TraceExporter:
+    """
+    Writes finished traces to a size-rotated file from a background thread.
+
+    Requests only put the trace on a bounded queue; when the queue is full
+    the trace is dropped and counted rather than making the request wait.
+    """
+
+    def __init__(self):
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=settings.TRACE_EXPORT_QUEUE_SIZE)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="trace-exporter", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.shutdown)
+
+    def _run(self):
+        path = settings.TRACE_EXPORT_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = RotatingFileHandler(
+            path,
+            maxBytes=settings.TRACE_EXPORT_MAX_BYTES,
+            backupCount=settings.TRACE_EXPORT_BACKUP_COUNT,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                break
+            try:
+                handler.emit(
+                    logging.makeLogRecord(
+                        {"msg": json.dumps(trace.to_otlp(), separators=(",", ":"))}
+                    )
+                )
+            except Exception:
+                logger.exception("Could not export trace %s", trace.trace_id)
+        handler.close()
+
+    def shutdown(self, timeout=5):
+        """
+        Flush queued traces and stop the exporter thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+exporter = TraceExporter()
+
+
+class TracingMiddleware:
+    """
+    Trace requests and export the sampled and the slow ones.
+
+    A request is head-sampled with probability ``TRACE_SAMPLE_RATE``, or
+    when an incoming W3C ``traceparent`` header says its caller sampled it.
+    Requests slower than ``TRACE_SLOW_REQUEST_MS`` are exported as well.
+    Removed from the stack unless ``TRACING_ENABLED`` is set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        parent = parse_traceparent(request.headers.get("traceparent"))
+        if parent is not None:
+            trace = Trace(*parent)
+        else:
+            trace = Trace(sampled=random.random() < settings.TRACE_SAMPLE_RATE)
+        token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            with trace.span(
+                f"{request.method} {request.path}",
+                SPAN_KIND_SERVER,
+                **{"http.method": request.method, "http.target": request.path},
+            ) as root, ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(
+                        connections[alias].execute_wrapper(_trace_query)
+                    )
+                response = self.get_response(request)
+                root.attributes["http.status_code"] = response.status_code
+                match = request.resolver_match
+                if match is not None:
+                    root.name = f"{request.method} {match.route}"
+                    root.attributes["http.route"] = match.route
+        finally:
+            _current_trace.reset(token)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if trace.sampled or elapsed_ms >= settings.TRACE_SLOW_REQUEST_MS:
+            exporter.export(trace)
+        return response
+
+
+def _trace_query(execute, sql, params, many, context):
+    connection = context["connection"]
+    with span(
+        "db.query",
+        SPAN_KIND_CLIENT,
+        **{
+            "db.system": connection.vendor,
+            "db.name": connection.alias,
+            "db.statement": sql,
+        },
+    ):
+        return execute(sql, params, many, context)
+
+
+class TracedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        with span("auth.jwt"):
+            return super().authenticate(request)
+
+
+class TracedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("render.json"):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TracedListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        with span(f"serialize {type(self.child).__name__}[]"):
+            return super().to_representation(data)
+
+    def run_validation(self, data=serializers.empty):
+        with span(f"validate {type(self.child).__name__}[]"):
+            return super().run_validation(data)
+
+
+class TracedSerializerMixin:
+    """
+    Record a span for serializing or validating with this serializer.
+
+    Items of a list are covered by the one span of their list serializer,
+    so the serializer's ``Meta.list_serializer_class`` should be
+    ``TracedListSerializer``.
+    """
+
+    def to_representation(self, instance):
+        if self.parent is not None:
+            return super().to_representation(instance)
+        with span(f"serialize {type(self).__name__}"):
+            return super().to_representation(instance)
+
+    def run_validation(self, data=serializers.empty):
+        if self.parent is not None:
+            return super().run_validation(data)
+        with span(f"validate {type(self).__name__}"):
+            return super().run_validation(data)
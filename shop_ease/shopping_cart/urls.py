@@ -5,9 +5,19 @@ from shopping_cart.utils import (
     CustomTokenObtainPairView,
 )
 from shopping_cart.views import (
+    BatchOrderAPIView,
+    BatchRequestAPIView,
+    CheckoutCartAPIView,
+    CheckoutOrderAPIView,
+    ManageCartAPIView,
     ManageOrderAPIView,
     ManageProductAPIView,
     ManagePurchaseAPIView,
+    OrderHistoryCacheStatsAPIView,
+    ProductAutocompleteAPIView,
+    ProductFacetsAPIView,
+    ProductRecommendationsAPIView,
+    ProfileAPIView,
     ManageUserAPIView,
     RegisterUserAPIView,
 )
@@ -23,6 +33,32 @@ urlpatterns = [
     path("user/", RegisterUserAPIView.as_view(), name="register_user"),
     path("api/user/", ManageUserAPIView.as_view(), name="fetch_user"),
     path("api/product/", ManageProductAPIView.as_view(), name="manage_product"),
+    path(
+        "api/product/autocomplete/",
+        ProductAutocompleteAPIView.as_view(),
+        name="product_autocomplete",
+    ),
+    path(
+        "api/product/facets/", ProductFacetsAPIView.as_view(), name="product_facets"
+    ),
+    path(
+        "api/product/recommendations/",
+        ProductRecommendationsAPIView.as_view(),
+        name="product_recommendations",
+    ),
     path("api/order/", ManageOrderAPIView.as_view(), name="manage_order"),
+    path("api/order/batch/", BatchOrderAPIView.as_view(), name="batch_order"),
+    path(
+        "api/order/checkout/", CheckoutOrderAPIView.as_view(), name="checkout_order"
+    ),
+    path(
+        "api/order/cache-stats/",
+        OrderHistoryCacheStatsAPIView.as_view(),
+        name="order_history_cache_stats",
+    ),
+    path("api/cart/", ManageCartAPIView.as_view(), name="manage_cart"),
+    path("api/cart/checkout/", CheckoutCartAPIView.as_view(), name="checkout_cart"),
     path("api/payment/", ManagePurchaseAPIView.as_view(), name="manage_payment"),
+    path("api/profiles/", ProfileAPIView.as_view(), name="profiles"),
+    path("api/batch/", BatchRequestAPIView.as_view(), name="batch_request"),
 ]
@@ -1,9 +1,13 @@
+from rest_framework import status
+from rest_framework.response import Response
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+from shopping_cart.hashers import HashingPoolBusy, hashing_pool
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
@@ -14,8 +18,30 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
+    """
+    API endpoint for obtaining a JWT pair with a username and password.
+
+    Methods:
+    - POST: Check the credentials and return access and refresh tokens.
+
+    Returns:
+    - Response: The token pair, or 503 with a Retry-After header when too
+      many logins are already waiting for the password hashing pool.
+    """
+
     serializer_class = CustomTokenObtainPairSerializer
 
+    def post(self, request, *args, **kwargs):
+        try:
+            with hashing_pool.admit():
+                return super().post(request, *args, **kwargs)
+        except HashingPoolBusy:
+            return Response(
+                {"error": "Too many logins in progress, please retry"},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": "1"},
+            )
+
 
 class CustomRefreshTokenObtainPairView(TokenRefreshView):
-    serializer_class = CustomTokenObtainPairSerializer
+    pass
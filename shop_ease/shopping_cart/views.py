@@ -1,16 +1,76 @@
-from decimal import Decimal
+import hashlib
+import io
+import pstats
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F
+from django.http import FileResponse, HttpResponse
+from django.db.models.functions import Floor
 from django.shortcuts import get_object_or_404
-from rest_framework import status
-from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import serializers, status
+from django.db import IntegrityError, transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from shopping_cart.models import Order, OrderItem, Payment, Product, User
+from shopping_cart.models import (
+    ArchivedOrder,
+    Order,
+    OrderProjection,
+    Payment,
+    Product,
+    User,
+)
 from shopping_cart.serializer import (
     PaymentSerializer,
     ProductSerializer,
     UserSerializer,
+    parse_fields_param,
+)
+from shopping_cart.caching import (
+    CATALOG_VERSION,
+    cache_products,
+    get_cached_products,
+    get_version,
+    invalidate_order_history,
+    order_history_cache,
+    order_history_version,
+)
+from shopping_cart.batch import InvalidSubRequest, parse_sub_request, run_batch
+from shopping_cart.cart import Cart, CartFull
+from shopping_cart.concurrency import VersionConflict, if_match_failed, make_etag
+from shopping_cart.inventory import (
+    OutOfStock,
+    commit_reservations,
+    release_reservations,
+    replace_reservations,
 )
-from rest_framework.permissions import AllowAny
+from shopping_cart.pricing import InvalidCoupon, quote_order
+from shopping_cart.profiling import list_profiles, profile_path
+from shopping_cart.projection import project_orders, read_documents
+from shopping_cart.recommendations import related_products_index
+from shopping_cart.search import product_name_index
+from shopping_cart.orders import (
+    BATCH_ORDER_LIMIT,
+    AmountMismatch,
+    OrderSettled,
+    check_order_editable,
+    checkout_order,
+    create_order,
+    create_orders_in_bulk,
+    parse_order_lines,
+    replace_order_items,
+    resolve_order_lines,
+)
+from rest_framework.permissions import AllowAny, IsAdminUser
+
+MAX_PRODUCT_IDS = 5000
+MAX_AUTOCOMPLETE_RESULTS = 50
+DEFAULT_BUCKET_SIZE = 100
+PROFILE_SUMMARY_LINES = 40
+ORDER_FIELDS = ["order_id", "user_id", "product_details", "total_price"]
 
 
 class RegisterUserAPIView(APIView):
@@ -139,23 +199,29 @@ class ManageProductAPIView(APIView):
         Retrieve products based on optional query parameters.
 
         This endpoint allows for retrieving products based on various query parameters such as
-        product name, minimum price, and maximum price.
+        product name, minimum price, and maximum price. Passing ``ids`` (comma separated product
+        IDs) instead looks the products up directly, see ``get_by_ids``. ``fields`` (comma
+        separated) limits both the columns loaded and the fields returned.
 
         Returns:
         - Response: JSON response with the list of products matching the criteria.
         """
-        product_name = request.GET.get("product_name", None)
-        minimum_price = request.GET.get("minimum_price", None)
-        maximum_price = request.GET.get("maximum_price", None)
-        query = Product.objects.filter(is_delete=False).all()
-        if product_name:
-            query = query.filter(product_name__icontains=product_name)
-        if minimum_price:
-            query = query.filter(price__gte=minimum_price)
-        if maximum_price:
-            query = query.filter(price__lte=maximum_price)
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), ProductSerializer.Meta.fields
+            )
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        if "ids" in request.GET:
+            return self.get_by_ids(request.GET["ids"], fields)
+        try:
+            query = self.filter_products(request.GET)
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        if fields:
+            query = query.only(*fields)
         if query.exists():
-            product_serializer = ProductSerializer(query, many=True)
+            product_serializer = ProductSerializer(query, many=True, fields=fields)
             return Response(product_serializer.data)
         else:
             return Response(
@@ -163,6 +229,85 @@ class ManageProductAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+    @staticmethod
+    def filter_products(params):
+        """
+        Build the product queryset for the product_name, minimum_price and maximum_price filters.
+
+        Returns:
+        - QuerySet: Live products matching the filters.
+
+        Raises:
+        - serializers.ValidationError: If a price is not a number.
+        """
+        product_name = params.get("product_name", None)
+        query = Product.objects.all()
+        if product_name:
+            query = query.filter(product_name__icontains=product_name)
+        errors = {}
+        for name, lookup in (
+            ("minimum_price", "price__gte"),
+            ("maximum_price", "price__lte"),
+        ):
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                price = Decimal(value)
+            except InvalidOperation:
+                price = None
+            if price is None or not price.is_finite():
+                errors[name] = ["A valid number is required."]
+                continue
+            query = query.filter(**{lookup: price})
+        if errors:
+            raise serializers.ValidationError(errors)
+        return query
+
+    def get_by_ids(self, ids, fields=None):
+        """
+        Retrieve products by a comma separated list of product IDs.
+
+        Products are returned in request order. Warm products are served from the cache and
+        the remaining ones are fetched with a single query. IDs that do not match a product are
+        reported under ``missing`` instead of failing the request.
+
+        Returns:
+        - Response: JSON response with the found products and the missing IDs.
+        """
+        try:
+            product_ids = list(dict.fromkeys(int(pk) for pk in ids.split(",") if pk))
+        except ValueError:
+            return Response(
+                {"error": "ids must be a comma separated list of product IDs"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(product_ids) > MAX_PRODUCT_IDS:
+            return Response(
+                {"error": f"At most {MAX_PRODUCT_IDS} ids can be requested at once"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        products = get_cached_products(product_ids)
+        cold_ids = [pk for pk in product_ids if pk not in products]
+        if cold_ids:
+            fetched = {
+                product.id: ProductSerializer(product).data
+                for product in Product.objects.filter(pk__in=cold_ids)
+            }
+            cache_products(fetched)
+            products.update(fetched)
+        if fields:
+            products = {
+                pk: {name: data[name] for name in fields}
+                for pk, data in products.items()
+            }
+        return Response(
+            {
+                "products": [products[pk] for pk in product_ids if pk in products],
+                "missing": [pk for pk in product_ids if pk not in products],
+            }
+        )
+
     @transaction.atomic
     def put(self, request, *args, **kwargs):
         """
@@ -175,11 +320,20 @@ class ManageProductAPIView(APIView):
         """
         request_body = request.data
         product_obj = get_object_or_404(Product, id=request_body.get("id"))
+        if if_match_failed(request, product_obj):
+            return Response(
+                {"error": "Product has changed", "version": product_obj.version},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
         if product_obj:
             serializer = ProductSerializer(product_obj, data=request_body)
             if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data)
+                try:
+                    serializer.save()
+                except VersionConflict as e:
+                    transaction.set_rollback(True)
+                    return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+                return Response(serializer.data, headers={"ETag": product_obj.etag})
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(
@@ -199,11 +353,20 @@ class ManageProductAPIView(APIView):
         """
         request_body = request.data
         product_obj = get_object_or_404(Product, id=request_body.get("id"))
+        if if_match_failed(request, product_obj):
+            return Response(
+                {"error": "Product has changed", "version": product_obj.version},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
         if product_obj:
             serializer = ProductSerializer(product_obj, data=request_body, partial=True)
             if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data)
+                try:
+                    serializer.save()
+                except VersionConflict as e:
+                    transaction.set_rollback(True)
+                    return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+                return Response(serializer.data, headers={"ETag": product_obj.etag})
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         return Response(
@@ -212,6 +375,164 @@ class ManageProductAPIView(APIView):
         )
 
 
+class ProductAutocompleteAPIView(APIView):
+    """
+    API endpoint for product name autocompletion.
+
+    Methods:
+    - GET: Retrieve products whose name matches the typed prefix.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve products whose name matches the typed prefix.
+
+        Matches come from an in-memory prefix index of product name words rather than a
+        database scan. Every word of ``q`` must start a word of the product name.
+
+        Returns:
+        - Response: JSON response with up to ``limit`` (default 10, max 50) matching products.
+        """
+        try:
+            limit = min(int(request.GET.get("limit", 10)), MAX_AUTOCOMPLETE_RESULTS)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        matches = product_name_index.search(request.GET.get("q", ""), limit)
+        return Response(
+            [
+                {"id": product_id, "product_name": product_name}
+                for product_id, product_name in matches
+            ]
+        )
+
+
+class ProductRecommendationsAPIView(APIView):
+    """
+    API endpoint for "frequently bought together" recommendations.
+
+    Methods:
+    - GET: Retrieve the products most often ordered together with a product.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve the products most often ordered together with a product.
+
+        Related products come from an in-memory index precomputed from order history by the
+        ``refresh_recommendations`` command; ``score`` is the number of orders that held both
+        products. Deleted products are left out.
+
+        Returns:
+        - Response: JSON response with up to ``limit`` (default 10, max ``RECOMMENDATION_TOP_K``)
+          related products, best first.
+        """
+        try:
+            product_id = int(request.GET.get("product_id"))
+            limit = min(
+                int(request.GET.get("limit", 10)), settings.RECOMMENDATION_TOP_K
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "product_id and limit must be numbers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        related = related_products_index.related(product_id, limit)
+        products = Product.objects.only("product_name", "price").in_bulk(
+            [related_id for related_id, _ in related]
+        )
+        return Response(
+            [
+                {
+                    "id": related_id,
+                    "product_name": products[related_id].product_name,
+                    "price": products[related_id].price,
+                    "score": score,
+                }
+                for related_id, score in related
+                if related_id in products
+            ]
+        )
+
+
+class ProductFacetsAPIView(APIView):
+    """
+    API endpoint for price facets of the product listing.
+
+    Methods:
+    - GET: Retrieve product counts per price bucket for the listing filters.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve product counts per price bucket for the listing filters.
+
+        Takes the same product_name, minimum_price and maximum_price filters as the product
+        listing, plus ``bucket_size`` (default 100). Counts come from one grouped query and are
+        cached until the catalog changes.
+
+        Returns:
+        - Response: JSON response with the non-empty price buckets and their product counts.
+        """
+        try:
+            bucket_size = Decimal(request.GET.get("bucket_size", DEFAULT_BUCKET_SIZE))
+        except InvalidOperation:
+            bucket_size = None
+        if bucket_size is None or not bucket_size.is_finite() or bucket_size <= 0:
+            return Response(
+                {"error": "bucket_size must be a positive number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        params = {
+            name: request.GET.get(name)
+            for name in ("product_name", "minimum_price", "maximum_price")
+        }
+        try:
+            products = ManageProductAPIView.filter_products(params)
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        cache_key = "product_facets:{}:{}".format(
+            get_version(CATALOG_VERSION),
+            hashlib.sha1(
+                repr((sorted(params.items()), bucket_size)).encode()
+            ).hexdigest(),
+        )
+        facets = cache.get(cache_key)
+        if facets is None:
+            rows = (
+                products.annotate(bucket=Floor(F("price") / bucket_size))
+                .values("bucket")
+                .annotate(count=Count("id"))
+                .order_by("bucket")
+            )
+            buckets = [
+                {
+                    "min_price": row["bucket"] * bucket_size,
+                    "max_price": (row["bucket"] + 1) * bucket_size,
+                    "count": row["count"],
+                }
+                for row in rows
+            ]
+            facets = {
+                "bucket_size": bucket_size,
+                "total": sum(bucket["count"] for bucket in buckets),
+                "buckets": buckets,
+            }
+            cache.set(cache_key, facets, timeout=settings.FACET_CACHE_TTL)
+        return Response(facets)
+
+
 class ManageOrderAPIView(APIView):
     """
     API endpoint for managing orders.
@@ -232,30 +553,33 @@ class ManageOrderAPIView(APIView):
         This endpoint allows authenticated users to create a new order by providing product IDs and quantities.
 
         Returns:
-        - Response: JSON response indicating success or failure of the order creation.
+        - Response: JSON response with the created order ID, or the reason of the failure.
         """
         try:
             request_body = request.data
-            order_obj = Order.objects.create(user=request.user)
-            for product_data in request_body.get("products", []):
-                product_id = product_data.get("product_id")
-                quantity = product_data.get("quantity")
-                product = Product.objects.get(pk=product_id)
-                OrderItem.objects.create(
-                    order=order_obj, product=product, quantity=quantity
-                )
-            total_price = sum(
-                item.product.price * item.quantity
-                for item in order_obj.orderitem_set.all()
+            order_obj = create_order(
+                request.user,
+                request_body.get("products", []),
+                request_body.get("coupon_code"),
             )
-            order_obj.total_price = total_price
-            order_obj.save()
-            return Response({"message": "Order created successfully"}, status=201)
+            return Response(
+                {"message": "Order created successfully", "order_id": order_obj.id},
+                status=201,
+            )
+        except OutOfStock as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except InvalidCoupon as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Product.DoesNotExist:
             return Response(
                 {"error": "One or more products do not exist"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        except (ValueError, TypeError):
+            return Response(
+                {"error": "Invalid order data"}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -266,45 +590,94 @@ class ManageOrderAPIView(APIView):
         Retrieve orders for the authenticated user, optionally by order ID.
 
         This endpoint allows authenticated users to retrieve their orders. If an order ID is provided,
-        only the details of that specific order are returned.
+        only the details of that specific order are returned. Settled orders moved to cold storage
+        are only included when ``include_archived=true`` is passed. Orders are read from their
+        rendered rows in the order projection; ``fields`` (comma separated) limits the fields
+        read from it and returned.
+
+        The list can be searched with ``created_after`` (inclusive) and ``created_before``
+        (exclusive), each a date or date-time, ``minimum_total_price``/``maximum_total_price`` and
+        ``payment_status``; each filter is served by an index of the projection. Staff can pass
+        ``user_id`` to retrieve the orders of another user.
 
         Returns:
         - Response: JSON response with order details.
         """
+        try:
+            fields = parse_fields_param(request.GET.get("fields"), ORDER_FIELDS)
+            lookups = self.parse_order_filters(request.GET)
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        owner_id = request.user.pk
+        if request.GET.get("user_id") is not None:
+            try:
+                owner_id = int(request.GET["user_id"])
+            except ValueError:
+                return Response(
+                    {"user_id": ["A valid integer is required."]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if owner_id != request.user.pk and not request.user.is_staff:
+                return Response(
+                    {"error": "Not allowed to view the orders of another user"},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
         try:
             order_id = request.GET.get("order_id")
+            include_archived = request.GET.get("include_archived") in ("1", "true")
+            archived_orders = []
+            headers = None
             if order_id is not None:
-                order_obj = Order.objects.get(user=request.user, id=order_id)
-                orders = [order_obj]
+                documents = read_documents(
+                    OrderProjection.objects.filter(user_id=owner_id, order_id=order_id),
+                    "document",
+                    fields,
+                    "order_version",
+                )
+                response_data = [document for document, _ in documents]
+                if documents:
+                    headers = {"ETag": make_etag(documents[0][1]["order_version"])}
+                elif include_archived:
+                    archived_orders = [
+                        ArchivedOrder.objects.get(user_id=owner_id, order_id=order_id)
+                    ]
+                else:
+                    raise OrderProjection.DoesNotExist
             else:
-                orders = Order.objects.filter(user=request.user)
-            response_data = []
-            for order in orders:
-                order_items = OrderItem.objects.filter(order=order)
-                product_details = []
-                for item in order_items:
-                    product = item.product
-                    quantity = item.quantity
-                    price = product.price
-                    product_details.append(
-                        {
-                            "product_id": product.id,
-                            "product_name": product.product_name,
-                            "product_description": product.description,
-                            "price": price,
-                            "quantity": quantity,
-                        }
-                    )
+                if lookups:
+                    response_data = [
+                        document
+                        for document, _ in read_documents(
+                            OrderProjection.objects.filter(
+                                user_id=owner_id, **lookups
+                            ).order_by("order"),
+                            "document",
+                            fields,
+                        )
+                    ]
+                else:
+                    response_data = self.load_order_history(owner_id)
+                if include_archived:
+                    archived_orders = ArchivedOrder.objects.filter(
+                        user_id=owner_id, **lookups
+                    ).order_by("created_at")
+            for archived_order in archived_orders:
                 response_data.append(
                     {
-                        "order_id": order.id,
-                        "user_id": order.user.id,
-                        "product_details": product_details,
-                        "total_price": order.total_price,
+                        "order_id": archived_order.order_id,
+                        "user_id": archived_order.user_id,
+                        "product_details": archived_order.items,
+                        "total_price": archived_order.total_price,
+                        "is_archived": True,
                     }
                 )
-            return Response(response_data, status=status.HTTP_200_OK)
-        except Order.DoesNotExist:
+            if fields:
+                response_data = [
+                    {name: order_data[name] for name in fields}
+                    for order_data in response_data
+                ]
+            return Response(response_data, status=status.HTTP_200_OK, headers=headers)
+        except (OrderProjection.DoesNotExist, ArchivedOrder.DoesNotExist):
             return Response(
                 {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
             )
@@ -313,6 +686,79 @@ class ManageOrderAPIView(APIView):
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def parse_order_filters(params):
+        """
+        Turn the order search parameters into lookups valid for both the order
+        projection and archived orders.
+
+        Raises:
+        - serializers.ValidationError: If a parameter is malformed.
+        """
+        lookups = {}
+        errors = {}
+        for name, lookup in (
+            ("created_after", "created_at__gte"),
+            ("created_before", "created_at__lt"),
+        ):
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                moment = parse_datetime(value)
+                if moment is None:
+                    day = parse_date(value)
+                    moment = day and datetime.combine(day, datetime.min.time())
+            except ValueError:
+                moment = None
+            if moment is None:
+                errors[name] = ["Expected a date or date-time."]
+                continue
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+            lookups[lookup] = moment
+        for name, lookup in (
+            ("minimum_total_price", "total_price__gte"),
+            ("maximum_total_price", "total_price__lte"),
+        ):
+            value = params.get(name)
+            if not value:
+                continue
+            try:
+                total = Decimal(value)
+            except InvalidOperation:
+                total = None
+            if total is None or not total.is_finite():
+                errors[name] = ["A valid number is required."]
+                continue
+            lookups[lookup] = total
+        payment_status = params.get("payment_status")
+        if payment_status:
+            if payment_status not in dict(Payment.PAYMENT_STATUS_CHOICES):
+                errors["payment_status"] = [
+                    f"Expected one of {', '.join(dict(Payment.PAYMENT_STATUS_CHOICES))}."
+                ]
+            lookups["payment_status"] = payment_status
+        if errors:
+            raise serializers.ValidationError(errors)
+        return lookups
+
+    @staticmethod
+    def load_order_history(user_id):
+        """
+        Rendered live orders of a user, served from the order-history cache.
+        """
+        version = order_history_version(user_id)
+        order_history = order_history_cache.get(user_id, version)
+        if order_history is None:
+            order_history = list(
+                OrderProjection.objects.filter(user_id=user_id)
+                .order_by("order")
+                .values_list("document", flat=True)
+            )
+            order_history_cache.set(user_id, version, order_history)
+        return list(order_history)
+
     @transaction.atomic
     def put(self, request, *args, **kwargs):
         """
@@ -326,38 +772,41 @@ class ManageOrderAPIView(APIView):
         try:
             request_body = request.data
             order_obj = Order.objects.get(pk=request_body.get("order_id", None))
-            existing_order_items = list(order_obj.orderitem_set.all())
-            new_order_items = []
+            if if_match_failed(request, order_obj):
+                return Response(
+                    {"error": "Order has changed", "version": order_obj.version},
+                    status=status.HTTP_412_PRECONDITION_FAILED,
+                )
             if order_obj:
-                for product_data in request_body.get("products", []):
-                    product_id = product_data.get("product_id")
-                    quantity = product_data.get("quantity")
-                    product = Product.objects.get(pk=product_id)
-                    order_item = order_obj.orderitem_set.filter(product=product).first()
-                    if order_item:
-                        order_item.quantity = quantity
-                        order_item.save()
-                        existing_order_items.remove(order_item)
-                    else:
-                        new_order_items.append(
-                            OrderItem(
-                                order=order_obj, product=product, quantity=quantity
-                            )
-                        )
-
-                for order_item in existing_order_items:
-                    order_item.delete()
-                for order_item in new_order_items:
-                    order_item.save()
-                total_price = sum(
-                    item.product.price * item.quantity
-                    for item in order_obj.orderitem_set.all()
+                check_order_editable(order_obj)
+                requested = parse_order_lines(request_body.get("products", []))
+                product_map = Product.objects.in_bulk(
+                    {product_id for product_id, _ in requested}
                 )
-                order_obj.total_price = Decimal(total_price)
+                order_lines = resolve_order_lines(requested, product_map)
+                replace_order_items(order_obj, order_lines)
+                quote = quote_order(
+                    order_lines,
+                    request_body.get("coupon_code", order_obj.coupon_code),
+                )
+                order_obj.total_price = quote["total_price"]
+                order_obj.discount_total = quote["discount_total"]
+                order_obj.coupon_code = quote["coupon_code"]
                 order_obj.save()
+                replace_reservations(order_obj, order_lines)
+                project_orders([order_obj.pk])
+                invalidate_order_history([order_obj.user_id])
                 return Response(
-                    {"message": "Order updated successfully"}, status=status.HTTP_200_OK
+                    {"message": "Order updated successfully"},
+                    status=status.HTTP_200_OK,
+                    headers={"ETag": order_obj.etag},
                 )
+        except (OutOfStock, OrderSettled, VersionConflict) as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except InvalidCoupon as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Order.DoesNotExist:
             return Response(
                 {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
@@ -367,12 +816,194 @@ class ManageOrderAPIView(APIView):
                 {"error": "One or more products do not exist"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        except (ValueError, TypeError):
+            transaction.set_rollback(True)
+            return Response(
+                {"error": "Invalid order data"}, status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 
+class BatchOrderAPIView(APIView):
+    """
+    API endpoint for creating many orders in one request.
+
+    Methods:
+    - POST: Create a batch of orders, reporting the result of each one.
+    """
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        """
+        Create a batch of orders, reporting the result of each one.
+
+        Each entry of ``orders`` takes the same ``products`` list as a single order, plus an
+        optional ``reference`` echoed back in its result and an optional ``user_id`` (staff only)
+        to order on behalf of another account. Failed entries do not affect the others.
+
+        Returns:
+        - Response: JSON response with one result per order; 207 if any order failed.
+        """
+        order_requests = request.data.get("orders")
+        if not isinstance(order_requests, list) or not all(
+            isinstance(data, dict) for data in order_requests
+        ):
+            return Response(
+                {"error": "orders must be a list of orders"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(order_requests) > BATCH_ORDER_LIMIT:
+            return Response(
+                {"error": f"A batch may contain at most {BATCH_ORDER_LIMIT} orders"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        results = create_orders_in_bulk(order_requests, request.user)
+        all_created = all(result["status"] == 201 for result in results)
+        return Response(
+            {"results": results},
+            status=(
+                status.HTTP_201_CREATED if all_created else status.HTTP_207_MULTI_STATUS
+            ),
+        )
+
+
+class CheckoutOrderAPIView(APIView):
+    """
+    API endpoint for creating and paying an order in one request.
+
+    Methods:
+    - POST: Create an order, price it and record its payment.
+    """
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        """
+        Create an order, price it and record its payment.
+
+        Takes the products and coupon code of Create Order plus the payment method and amount of
+        Create Payment. The order, its items, the stock and the completed payment are written in
+        one transaction; if the amount does not match the order total nothing is written.
+
+        Returns:
+        - Response: JSON response with the order ID, total price and transaction ID.
+        """
+        request_body = request.data
+        payment_method = request_body.get("payment_method")
+        if payment_method not in dict(Payment.PAYMENT_METHOD_CHOICES):
+            return Response(
+                {"error": "Invalid payment method"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            amount_paid = Decimal(str(request_body.get("amount_paid")))
+        except InvalidOperation:
+            return Response(
+                {"error": "amount_paid must be a number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            order_obj, payment = checkout_order(
+                request.user,
+                request_body.get("products", []),
+                payment_method,
+                amount_paid,
+                request_body.get("coupon_code"),
+            )
+        except OutOfStock as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except (InvalidCoupon, AmountMismatch) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Product.DoesNotExist:
+            return Response(
+                {"error": "One or more products do not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except (ValueError, TypeError, AttributeError):
+            return Response(
+                {"error": "Invalid order data"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {
+                "message": "Payment successful",
+                "order_id": order_obj.id,
+                "total_price": order_obj.total_price,
+                "transaction_id": payment.transaction_id,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class OrderHistoryCacheStatsAPIView(APIView):
+    """
+    API endpoint for monitoring the order-history cache.
+
+    Methods:
+    - GET: Retrieve the size and hit/miss counters of this worker's cache.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve the size and hit/miss counters of this worker's order-history cache.
+
+        Returns:
+        - Response: JSON response with the cache statistics.
+        """
+        return Response(order_history_cache.stats(), status=status.HTTP_200_OK)
+
+
+class ProfileAPIView(APIView):
+    """
+    API endpoint for request profiles captured by the profiling middleware.
+
+    Methods:
+    - GET: List the stored profiles, or download one by ID.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        """
+        List the stored profiles, or download one by ID.
+
+        Without ``id`` the profiles are listed newest first, optionally only those of one ``view``
+        (such as ``ManageOrderAPIView.put``). With ``id`` the pstats file is downloaded; pass
+        ``output=text`` for the top functions by cumulative time instead.
+
+        Returns:
+        - Response: JSON list of profiles, the pstats file or a plain text summary.
+        """
+        profile_id = request.GET.get("id")
+        if profile_id is None:
+            profiles = list_profiles()
+            view = request.GET.get("view")
+            if view:
+                profiles = [profile for profile in profiles if profile["view"] == view]
+            return Response(profiles, status=status.HTTP_200_OK)
+        path = profile_path(profile_id)
+        if path is None:
+            return Response(
+                {"error": "Profile not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        if request.GET.get("output") == "text":
+            summary = io.StringIO()
+            pstats.Stats(str(path), stream=summary).sort_stats(
+                "cumulative"
+            ).print_stats(PROFILE_SUMMARY_LINES)
+            return HttpResponse(summary.getvalue(), content_type="text/plain")
+        return FileResponse(
+            open(path, "rb"),
+            as_attachment=True,
+            filename=path.name,
+            content_type="application/octet-stream",
+        )
+
+
 class ManagePurchaseAPIView(APIView):
     """
     API endpoint for managing purchases.
@@ -413,23 +1044,29 @@ class ManagePurchaseAPIView(APIView):
                 amount_to_paid = request_body.get("amount_paid", None)
                 total_amount = order_obj.total_price
                 if amount_to_paid == total_amount:
+                    commit_reservations(order_obj)
+                    invalidate_order_history([order_obj.user_id])
                     Payment.objects.create(
                         order=order_obj,
                         payment_method=payment_method,
                         amount_paid=amount_to_paid,
                         payment_status="Completed",
                     )
+                    project_orders([order_obj.pk])
                     return Response(
                         {"message": "Payment successful"},
                         status=status.HTTP_201_CREATED,
                     )
                 else:
+                    release_reservations(order_obj)
+                    invalidate_order_history([order_obj.user_id])
                     Payment.objects.create(
                         order=order_obj,
                         payment_method=payment_method,
                         amount_paid=amount_to_paid,
                         payment_status="Failed",
                     )
+                    project_orders([order_obj.pk])
                     return Response(
                         {
                             "error": "Amount paid does not match total amount. Payment failed."
@@ -440,6 +1077,16 @@ class ManagePurchaseAPIView(APIView):
                 return Response(
                     {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
                 )
+        except OutOfStock as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except IntegrityError:
+            # A concurrent request created the payment first.
+            transaction.set_rollback(True)
+            return Response(
+                {"error": "Payment already exists for the order"},
+                status=status.HTTP_409_CONFLICT,
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -451,22 +1098,48 @@ class ManagePurchaseAPIView(APIView):
 
         This endpoint allows authenticated users to retrieve payments for their orders.
         If an order ID is provided, details of the payment for that specific order are returned.
+        Payments are read from the order projection; ``fields`` (comma separated) limits the
+        fields read from it and returned.
 
         Returns:
         - Response: JSON response with payment details.
         """
+        try:
+            fields = parse_fields_param(
+                request.GET.get("fields"), PaymentSerializer.Meta.fields
+            )
+        except serializers.ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         try:
             order_id = request.GET.get("order_id")
+            projections = OrderProjection.objects.filter(user=request.user)
             if order_id:
-                order_obj = Order.objects.get(user=request.user, pk=order_id)
-                payment_obj = Payment.objects.get(order=order_obj)
-                serializer = PaymentSerializer(payment_obj)
-                return Response(serializer.data)
+                documents = read_documents(
+                    projections.filter(order_id=order_id),
+                    "payment",
+                    fields,
+                    "payment_status",
+                    "payment__version",
+                )
+                if not documents:
+                    raise OrderProjection.DoesNotExist
+                payment, row = documents[0]
+                if row["payment_status"] is None:
+                    raise Payment.DoesNotExist
+                return Response(
+                    payment, headers={"ETag": make_etag(row["payment__version"])}
+                )
             else:
-                payments = Payment.objects.filter(order__user=request.user)
-                serializer = PaymentSerializer(payments, many=True)
-                return Response(serializer.data)
-        except Order.DoesNotExist:
+                payments = projections.filter(payment_status__isnull=False).order_by(
+                    "order"
+                )
+                return Response(
+                    [
+                        payment
+                        for payment, _ in read_documents(payments, "payment", fields)
+                    ]
+                )
+        except OrderProjection.DoesNotExist:
             return Response(
                 {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
             )
@@ -479,6 +1152,7 @@ class ManagePurchaseAPIView(APIView):
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @transaction.atomic
     def put(self, request, *args, **kwargs):
         """
         Update an existing payment for an order.
@@ -493,29 +1167,50 @@ class ManagePurchaseAPIView(APIView):
             order_obj = Order.objects.get(id=request_body.get("order_id", None))
             if order_obj:
                 existing_payment = Payment.objects.filter(order=order_obj).first()
+                if existing_payment is None:
+                    return Response(
+                        {"error": "Payment not found"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                if if_match_failed(request, existing_payment):
+                    return Response(
+                        {
+                            "error": "Payment has changed",
+                            "version": existing_payment.version,
+                        },
+                        status=status.HTTP_412_PRECONDITION_FAILED,
+                    )
                 if not existing_payment.payment_status == "Completed":
-                    if existing_payment:
-                        payment_method = request_body.get("payment_method", None)
-                        amount_to_paid = request_body.get("amount_paid", None)
-                        total_amount = order_obj.total_price
-                        if amount_to_paid == total_amount:
-                            existing_payment.payment_method = payment_method
-                            existing_payment.payment_status = "Completed"
-                            existing_payment.amount_paid = amount_to_paid
-                            existing_payment.save()
-                            serilizer = PaymentSerializer(existing_payment)
-                            return Response(serilizer.data)
-                        else:
-                            existing_payment.payment_method = payment_method
-                            existing_payment.payment_status = "Failed"
-                            existing_payment.amount_paid = amount_to_paid
-                            existing_payment.save()
-                            return Response(
-                                {
-                                    "error": "Amount paid does not match total amount. Payment failed."
-                                },
-                                status=status.HTTP_400_BAD_REQUEST,
-                            )
+                    payment_method = request_body.get("payment_method", None)
+                    amount_to_paid = request_body.get("amount_paid", None)
+                    total_amount = order_obj.total_price
+                    if amount_to_paid == total_amount:
+                        commit_reservations(order_obj)
+                        invalidate_order_history([order_obj.user_id])
+                        existing_payment.payment_method = payment_method
+                        existing_payment.payment_status = "Completed"
+                        existing_payment.amount_paid = amount_to_paid
+                        existing_payment.save()
+                        project_orders([order_obj.pk])
+                        serilizer = PaymentSerializer(existing_payment)
+                        return Response(
+                            serilizer.data,
+                            headers={"ETag": existing_payment.etag},
+                        )
+                    else:
+                        release_reservations(order_obj)
+                        invalidate_order_history([order_obj.user_id])
+                        existing_payment.payment_method = payment_method
+                        existing_payment.payment_status = "Failed"
+                        existing_payment.amount_paid = amount_to_paid
+                        existing_payment.save()
+                        project_orders([order_obj.pk])
+                        return Response(
+                            {
+                                "error": "Amount paid does not match total amount. Payment failed."
+                            },
+                            status=status.HTTP_400_BAD_REQUEST,
+                        )
                 else:
                     return Response(
                         {"error": "Payment already completed"},
@@ -525,7 +1220,245 @@ class ManagePurchaseAPIView(APIView):
                 return Response(
                     {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
                 )
+        except (OutOfStock, VersionConflict) as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except Order.DoesNotExist:
+            return Response(
+                {"error": "Order not found"}, status=status.HTTP_404_NOT_FOUND
+            )
         except Exception as e:
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ManageCartAPIView(APIView):
+    """
+    API endpoint for managing the shopping cart of the authenticated user.
+
+    The cart lives in the shared cart cache, not in the orders, until it is checked out.
+
+    Methods:
+    - GET: Retrieve the cart with current product details.
+    - POST: Add a quantity of a product to the cart.
+    - PUT: Set the quantity of a product in the cart (0 removes it).
+    - DELETE: Remove a product from the cart, or empty the cart.
+    """
+
+    def _parse_line(self, data, default_quantity=None, min_quantity=0):
+        try:
+            product_id = int(data.get("product_id"))
+            quantity = int(data.get("quantity", default_quantity))
+        except (TypeError, ValueError):
+            return None
+        if not min_quantity <= quantity <= settings.CART_MAX_QUANTITY:
+            return None
+        return product_id, quantity
+
+    def _change_cart(self, request, change, product_id, quantity):
+        if quantity and not (
+            get_cached_products([product_id])
+            or Product.objects.filter(pk=product_id).exists()
+        ):
+            return Response(
+                {"error": "Product not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        cart = Cart(request.user)
+        try:
+            getattr(cart, change)(product_id, quantity)
+        except CartFull as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"products": cart.as_order_lines()})
+
+    def get(self, request, *args, **kwargs):
+        """
+        Retrieve the cart with current product details.
+
+        Prices include active promotions; pass ``coupon_code`` to preview a coupon.
+
+        Returns:
+        - Response: JSON response with the cart lines and their total price.
+        """
+        cart = Cart(request.user)
+        product_map = Product.objects.in_bulk(list(cart.items))
+        order_lines = []
+        product_details = []
+        for product_id, quantity in cart.items.items():
+            product = product_map.get(product_id)
+            if product is None:
+                continue
+            order_lines.append((product, quantity))
+            product_details.append(
+                {
+                    "product_id": product.id,
+                    "product_name": product.product_name,
+                    "price": product.price,
+                    "quantity": quantity,
+                }
+            )
+        try:
+            quote = quote_order(order_lines, request.GET.get("coupon_code"))
+        except InvalidCoupon as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "product_details": product_details,
+                "discount_total": quote["discount_total"],
+                "total_price": quote["total_price"],
+            }
+        )
+
+    def post(self, request, *args, **kwargs):
+        """
+        Add a quantity of a product to the cart.
+
+        Returns:
+        - Response: JSON response with the cart contents.
+        """
+        line = self._parse_line(request.data, default_quantity=1, min_quantity=1)
+        if line is None:
+            return Response(
+                {"error": "A valid product_id and quantity are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self._change_cart(request, "add", *line)
+
+    def put(self, request, *args, **kwargs):
+        """
+        Set the quantity of a product in the cart; a quantity of 0 removes it.
+
+        Returns:
+        - Response: JSON response with the cart contents.
+        """
+        line = self._parse_line(request.data)
+        if line is None:
+            return Response(
+                {"error": "A valid product_id and quantity are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return self._change_cart(request, "set", *line)
+
+    def delete(self, request, *args, **kwargs):
+        """
+        Remove a product from the cart, or empty the cart if no product_id is given.
+
+        Returns:
+        - Response: JSON response with the cart contents.
+        """
+        cart = Cart(request.user)
+        product_id = request.GET.get("product_id")
+        if product_id is None:
+            cart.clear()
+        elif product_id.isdigit():
+            cart.remove(int(product_id))
+        else:
+            return Response(
+                {"error": "A valid product_id is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({"products": cart.as_order_lines()})
+
+
+class CheckoutCartAPIView(APIView):
+    """
+    API endpoint for turning the cart of the authenticated user into an order.
+
+    Methods:
+    - POST: Create an order from the cart and empty the cart.
+    """
+
+    @transaction.atomic
+    def post(self, request, *args, **kwargs):
+        """
+        Create an order from the cart and empty the cart.
+
+        The order and all of its items are written in one transaction.
+
+        Returns:
+        - Response: JSON response with the created order ID and total price.
+        """
+        cart = Cart(request.user)
+        if not cart.items:
+            return Response(
+                {"error": "Cart is empty"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            order_obj = create_order(
+                request.user, cart.as_order_lines(), request.data.get("coupon_code")
+            )
+        except OutOfStock as e:
+            transaction.set_rollback(True)
+            return Response({"error": str(e)}, status=status.HTTP_409_CONFLICT)
+        except InvalidCoupon as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Product.DoesNotExist:
+            # Products deleted since they were added; drop them so the next
+            # checkout can go through.
+            missing = set(cart.items).difference(
+                Product.objects.filter(pk__in=list(cart.items)).values_list(
+                    "pk", flat=True
+                )
+            )
+            for product_id in missing:
+                cart.remove(product_id)
+            return Response(
+                {
+                    "error": "Some products in the cart are no longer available and were removed",
+                    "missing": sorted(missing),
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
+        transaction.on_commit(cart.clear)
+        return Response(
+            {
+                "message": "Order created successfully",
+                "order_id": order_obj.id,
+                "total_price": order_obj.total_price,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class BatchRequestAPIView(APIView):
+    """
+    API endpoint for sending several API requests in one round trip.
+
+    Methods:
+    - POST: Run a list of sub-requests and return all of their responses.
+    """
+
+    def post(self, request, *args, **kwargs):
+        """
+        Run a list of sub-requests and return all of their responses.
+
+        Each entry of ``requests`` names a ``method``, an ``/api/`` ``path`` and optionally an
+        ``id`` echoed back in its response, query ``params``, a JSON ``body`` and ``headers``.
+        Sub-requests run as the user authenticated for the batch. Consecutive GET requests run
+        concurrently; other methods run one at a time in the order given. Sub-requests are not
+        atomic together: a failed one does not undo the others.
+
+        Returns:
+        - Response: JSON response with one ``id``, ``status``, ``headers`` and ``body`` per
+          sub-request, in the order they were given.
+        """
+        entries = request.data.get("requests")
+        if not isinstance(entries, list) or not entries:
+            return Response(
+                {"error": "requests must be a non-empty list of requests"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(entries) > settings.BATCH_REQUEST_LIMIT:
+            return Response(
+                {
+                    "error": f"A batch may contain at most {settings.BATCH_REQUEST_LIMIT} requests"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            sub_requests = [parse_sub_request(entry) for entry in entries]
+        except InvalidSubRequest as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {"responses": run_batch(request, sub_requests)}, status=status.HTTP_200_OK
+        )
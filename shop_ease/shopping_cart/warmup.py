@@ -0,0 +1,107 @@
+import importlib
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+
+from shopping_cart.caching import cache_products
+from shopping_cart.models import Product
+from shopping_cart.pricing import get_compiled_rules
+from shopping_cart.recommendations import related_products_index
+from shopping_cart.search import product_name_index
+from shopping_cart.serializer import (
+    PaymentSerializer,
+    ProductSerializer,
+    UserSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+WARMUP_MODULES = [
+    "shopping_cart.views",
+    "shopping_cart.serializer",
+    "shopping_cart.urls",
+    "rest_framework_simplejwt.authentication",
+]
+
+
+def _import_modules():
+    for name in WARMUP_MODULES:
+        importlib.import_module(name)
+
+
+def _populate_url_resolver():
+    get_resolver().reverse_dict
+
+
+def _build_serializer_fields():
+    for serializer_class in (UserSerializer, ProductSerializer, PaymentSerializer):
+        serializer_class().fields
+
+
+def _open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def _prefill_product_cache():
+    # Fill at most half of the product cache, leaving room for the products
+    # requested once the worker serves traffic.
+    limit = min(settings.WARMUP_PRODUCT_LIMIT, settings.PRODUCT_CACHE_MAX_ENTRIES // 2)
+    products = Product.objects.order_by("-updated_at")[:limit]
+    cache_products(
+        {product.id: ProductSerializer(product).data for product in products}
+    )
+
+
+WARMUP_STEPS = [
+    ("imports", _import_modules),
+    ("url_resolver", _populate_url_resolver),
+    ("serializers", _build_serializer_fields),
+    ("connections", _open_connections),
+    ("product_cache", _prefill_product_cache),
+    ("product_index", product_name_index.warm),
+    ("recommendations", related_products_index.warm),
+    ("pricing_rules", get_compiled_rules),
+]
+
+# Timings of the last warm_up() in this process, None until it has run.
+last_timings = None
+
+
+def warm_up(close_connections=False):
+    """
+    Prime a freshly started worker before it serves traffic.
+
+    Imports the views and serializers, builds URL resolver and serializer
+    field caches, opens the database connections and fills the product
+    cache, name index, recommendation index and compiled pricing rules. A
+    failing step is logged and skipped so warm-up can never keep a worker
+    from booting.
+
+    Pass ``close_connections`` when warm-up runs in a master process that
+    forks the workers afterwards (gunicorn --preload), so they do not share
+    its connections; a worker keeps them open for its first requests.
+
+    Returns:
+    - dict: Milliseconds spent in each step, or None for failed steps.
+    """
+    global last_timings
+    steps = list(WARMUP_STEPS)
+    if close_connections:
+        steps.append(("close_connections", connections.close_all))
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+            timings[name] = None
+            continue
+        timings[name] = (time.perf_counter() - started) * 1000
+    logger.info("Warm-up finished: %s", timings)
+    last_timings = timings
+    return timings